@@ -0,0 +1,20 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS
+from django.test.utils import setup_databases, teardown_databases
+
+
+@contextmanager
+def scratch_database():
+    """
+    Run the block against a freshly migrated copy of the default database
+    (Django's test database), dropped afterwards, so benchmarks never seed
+    or delete rows in the configured one.
+    """
+    old_config = setup_databases(
+        verbosity=0, interactive=False, aliases={DEFAULT_DB_ALIAS}
+    )
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
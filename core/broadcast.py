@@ -0,0 +1,76 @@
+import asyncio
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from functools import cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """Async iterator over the messages published to one group."""
+
+    # Oldest messages are dropped past this, so a stalled client can't
+    # make the queue grow without bound
+    max_pending = 100
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(self.max_pending)
+
+    def put(self, message):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.queue.get()
+
+
+class InProcessBroadcast:
+    """
+    Fans messages out to subscribers in this process. ``publish`` may be
+    called from any thread, e.g. sync views run by the ASGI handler.
+
+    Only clients connected to the same process receive events; a
+    deployment with several processes needs a shared backend (Redis
+    pub/sub, Postgres LISTEN/NOTIFY) with the same interface.
+    """
+
+    def __init__(self):
+        self.groups = defaultdict(set)
+        self.lock = threading.Lock()
+
+    @asynccontextmanager
+    async def subscribe(self, group):
+        subscription = Subscription(asyncio.get_running_loop())
+        with self.lock:
+            self.groups[group].add(subscription)
+        try:
+            yield subscription
+        finally:
+            with self.lock:
+                self.groups[group].discard(subscription)
+                if not self.groups[group]:
+                    del self.groups[group]
+
+    def publish(self, group, message):
+        with self.lock:
+            subscriptions = list(self.groups.get(group, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, message)
+            except RuntimeError:  # its event loop has shut down
+                pass
+
+
+@cache
+def get_broadcast():
+    # One shared instance per process, unlike the other pluggable backends
+    return import_string(
+        getattr(settings, "BROADCAST_BACKEND", "core.broadcast.InProcessBroadcast")
+    )()
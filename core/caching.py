@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+
+# Without a shared cache alias, entries live in each process's default cache
+# where other processes' invalidations can't reach them; keep them brief
+LOCAL_CACHE_TIMEOUT = 60
+
+
+class InvalidatedCache:
+    """
+    Entries kept until the data behind them changes and ``delete_on_commit``
+    drops them. They live in the cache alias named by ``settings.<alias>``
+    for ``settings.<timeout>`` seconds (a day by default), or for
+    LOCAL_CACHE_TIMEOUT in the default cache when no alias is set.
+    """
+
+    def __init__(self, alias, timeout):
+        self.alias_setting = alias
+        self.timeout_setting = timeout
+
+    @property
+    def cache(self):
+        alias = getattr(settings, self.alias_setting, None)
+        return cache if alias is None else caches[alias]
+
+    @property
+    def timeout(self):
+        if getattr(settings, self.alias_setting, None) is None:
+            return LOCAL_CACHE_TIMEOUT
+        return getattr(settings, self.timeout_setting, 60 * 60 * 24)
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.timeout)
+
+    def delete_on_commit(self, key):
+        # After commit, so a concurrent read can't re-cache the old value
+        transaction.on_commit(lambda: self.cache.delete(key))
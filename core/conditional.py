@@ -0,0 +1,37 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    """Build a strong ETag from the values the representation depends on."""
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+class ConditionalGetMixin:
+    """
+    Helpers for answering If-None-Match / If-Modified-Since before any
+    serialization happens. Views compute validators from a cheap query, call
+    ``not_modified`` and, if that returns nothing, build the full response and
+    pass it through ``set_validators``.
+    """
+
+    def not_modified(self, request, etag, last_modified=None):
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=int(last_modified.timestamp()) if last_modified else None,
+        )
+        if response is not None:
+            self.set_validators(response, etag, last_modified)
+        return response
+
+    def set_validators(self, response, etag, last_modified=None):
+        response["ETag"] = etag
+        if last_modified:
+            response["Last-Modified"] = http_date(last_modified.timestamp())
+        # Representations differ per user
+        patch_vary_headers(response, ["Authorization"])
+        return response
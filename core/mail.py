@@ -0,0 +1,294 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+class MailSenderStats:
+    def __init__(self):
+        self.connections_opened = 0
+        self.batches = 0
+        self.messages_sent = 0
+        self.messages_failed = 0
+        self.send_seconds = 0.0
+        self.max_batch_seconds = 0.0
+
+    @property
+    def messages_per_connection(self):
+        if not self.connections_opened:
+            return 0.0
+        return self.messages_sent / self.connections_opened
+
+    @property
+    def seconds_per_message(self):
+        attempted = self.messages_sent + self.messages_failed
+        return self.send_seconds / attempted if attempted else 0.0
+
+    def as_dict(self):
+        return {
+            "connections_opened": self.connections_opened,
+            "batches": self.batches,
+            "messages_sent": self.messages_sent,
+            "messages_failed": self.messages_failed,
+            "messages_per_connection": round(self.messages_per_connection, 2),
+            "ms_per_message": round(self.seconds_per_message * 1000, 2),
+            "max_batch_ms": round(self.max_batch_seconds * 1000, 2),
+        }
+
+
+class BatchedMailSender:
+    """
+    Sends messages in batches over one long-lived mail connection.
+
+    The connection is opened on first use and reused across calls; it is
+    recycled after ``max_messages_per_connection`` messages (SMTP servers cap
+    this) or after ``idle_timeout`` seconds without sending. If a batch
+    fails, its messages are retried one by one on a fresh connection to find
+    the bad ones. Messages that went out before the failure may then be sent
+    twice, which is fine for queue delivery (already at-least-once).
+    """
+
+    batch_size = 50
+    max_messages_per_connection = 100
+    idle_timeout = 30
+
+    def __init__(self, batch_size=None, connection=None):
+        self.batch_size = batch_size or self.batch_size
+        self.connection = connection or get_connection()
+        self.stats = MailSenderStats()
+        self._is_open = False
+        self._sent_on_connection = 0
+        self._last_used = 0.0
+
+    def open(self):
+        if self._is_open and (
+            self._sent_on_connection >= self.max_messages_per_connection
+            or time.monotonic() - self._last_used > self.idle_timeout
+        ):
+            self.close()
+        if not self._is_open:
+            self.connection.open()
+            self._is_open = True
+            self._sent_on_connection = 0
+            self.stats.connections_opened += 1
+
+    def close(self):
+        if self._is_open:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self._is_open = False
+
+    def _send_batch(self, messages):
+        self.open()
+        started = time.monotonic()
+        try:
+            self.connection.send_messages(messages)
+        finally:
+            elapsed = time.monotonic() - started
+            self._last_used = time.monotonic()
+            self.stats.batches += 1
+            self.stats.send_seconds += elapsed
+            self.stats.max_batch_seconds = max(self.stats.max_batch_seconds, elapsed)
+
+    def send(self, messages):
+        """Send ``messages``; return a list of (message, error or None)."""
+        results = []
+        for i in range(0, len(messages), self.batch_size):
+            batch = messages[i : i + self.batch_size]
+            try:
+                self._send_batch(batch)
+            except Exception:
+                self.close()
+                for message in batch:
+                    try:
+                        self._send_batch([message])
+                    except Exception as error:
+                        self.close()
+                        self.stats.messages_failed += 1
+                        results.append((message, error))
+                    else:
+                        self._count_sent(1)
+                        results.append((message, None))
+            else:
+                self._count_sent(len(batch))
+                results.extend((message, None) for message in batch)
+        return results
+
+    def _count_sent(self, count):
+        self._sent_on_connection += count
+        self.stats.messages_sent += count
+
+
+class ImmediateMailQueue:
+    """Sends right away, inside the request (the old behaviour)."""
+
+    def enqueue(self, to, subject, body, from_email=None):
+        message = EmailMessage(
+            subject, body, from_email=from_email or settings.EMAIL_HOST_USER, to=[to]
+        )
+        try:
+            message.send()
+        except Exception:
+            logger.exception("Sending mail to %s failed", to)
+
+    def enqueue_many(self, messages):
+        """Send several (to, subject, body) messages."""
+        for to, subject, body in messages:
+            self.enqueue(to, subject, body)
+
+
+class DatabaseMailQueue:
+    """
+    Stores the message in the OutboundEmail table; the ``send_queued_mail``
+    worker delivers it.
+
+    Bodies can hold one-time codes, so they are blanked once sent, and
+    sent or failed rows are deleted after ``retention``.
+    """
+
+    max_attempts = 5
+    retry_delay = timedelta(seconds=30)
+    max_retry_delay = timedelta(hours=1)
+    claim_timeout = timedelta(minutes=5)
+    retention = timedelta(days=7)
+
+    def enqueue(self, to, subject, body, from_email=None):
+        return OutboundEmail.objects.create(
+            to=to,
+            subject=subject,
+            body=body,
+            from_email=from_email or settings.EMAIL_HOST_USER,
+        )
+
+    def enqueue_many(self, messages, batch_size=500):
+        """Queue several (to, subject, body) messages with bulk inserts."""
+        return OutboundEmail.objects.bulk_create(
+            (
+                OutboundEmail(
+                    to=to, subject=subject, body=body, from_email=settings.EMAIL_HOST_USER
+                )
+                for to, subject, body in messages
+            ),
+            batch_size=batch_size,
+        )
+
+    def claim(self, limit):
+        """
+        Mark up to ``limit`` due rows as being sent and return them. Rows a
+        crashed worker left claimed become due again after ``claim_timeout``.
+        Each claim counts as an attempt, so a message that keeps crashing
+        its worker is given up after ``max_attempts`` too.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            due = (
+                OutboundEmail.objects.select_for_update(skip_locked=True)
+                .filter(
+                    Q(status="pending") | Q(status="sending"), next_attempt_at__lte=now
+                )
+                .order_by("next_attempt_at")[:limit]
+            )
+            emails, exhausted = [], []
+            for email in due:
+                if email.attempts >= self.max_attempts:
+                    exhausted.append(email.pk)
+                else:
+                    email.status = "sending"
+                    email.attempts += 1
+                    emails.append(email)
+            OutboundEmail.objects.filter(pk__in=exhausted).update(
+                status="failed", last_error="Claim expired without a result"
+            )
+            OutboundEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+                status="sending",
+                attempts=F("attempts") + 1,
+                next_attempt_at=now + self.claim_timeout,
+            )
+        return emails
+
+    def mark_sent(self, email):
+        email.status = "sent"
+        email.sent_at = timezone.now()
+        email.body = ""
+        email.save(update_fields=["status", "sent_at", "body"])
+
+    def mark_failed(self, email, error):
+        email.last_error = str(error)
+        if email.attempts >= self.max_attempts:
+            email.status = "failed"
+        else:
+            email.status = "pending"
+            delay = min(
+                self.retry_delay * 2 ** (email.attempts - 1), self.max_retry_delay
+            )
+            email.next_attempt_at = timezone.now() + delay
+        email.save(update_fields=["status", "last_error", "next_attempt_at"])
+
+    def deliver(self, emails, sender):
+        messages = [
+            EmailMessage(
+                email.subject,
+                email.body,
+                from_email=email.from_email or None,
+                to=[email.to],
+            )
+            for email in emails
+        ]
+        sent = 0
+        for email, (message, error) in zip(emails, sender.send(messages)):
+            if error is None:
+                self.mark_sent(email)
+                sent += 1
+            else:
+                logger.warning(
+                    "Sending mail %s to %s failed: %s", email.pk, email.to, error
+                )
+                self.mark_failed(email, error)
+        return sent
+
+    def drain(self, batch_size=100, sender=None):
+        """
+        Deliver everything that is due and return how many messages were
+        sent. Pass a long-lived ``sender`` to keep its connection open
+        between drains; otherwise one is opened and closed here.
+        """
+        own_sender = sender is None
+        if own_sender:
+            sender = BatchedMailSender()
+        sent = 0
+        try:
+            while True:
+                emails = self.claim(batch_size)
+                if not emails:
+                    break
+                sent += self.deliver(emails, sender)
+        finally:
+            if own_sender:
+                sender.close()
+        self.prune()
+        return sent
+
+    def prune(self):
+        """Delete sent and failed rows older than ``retention``."""
+        return OutboundEmail.objects.filter(
+            status__in=["sent", "failed"],
+            created_at__lt=timezone.now() - self.retention,
+        ).delete()[0]
+
+
+def get_mail_queue():
+    return import_string(
+        getattr(settings, "MAIL_QUEUE_BACKEND", "core.mail.DatabaseMailQueue")
+    )()
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+
+class BatchDeleteCommand(BaseCommand):
+    """
+    Deletes the rows of ``get_queryset()`` a batch of ids at a time, so each
+    delete is a short transaction rather than one holding every row. Set
+    ``description`` (what is deleted) and ``noun`` (for progress output).
+    """
+
+    description = None
+    noun = "rows"
+
+    @property
+    def help(self):
+        return (
+            f"{self.description} in small batches. "
+            "Meant to run periodically, e.g. from cron."
+        )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    def delete_batch(self, queryset, ids):
+        queryset.model._default_manager.filter(pk__in=ids).delete()
+
+    def handle(self, *args, **options):
+        queryset = self.get_queryset().order_by()
+        total = 0
+        while True:
+            ids = list(queryset.values_list("pk", flat=True)[: options["batch_size"]])
+            if not ids:
+                break
+            self.delete_batch(queryset, ids)
+            total += len(ids)
+            self.stdout.write(f"Deleted {total} {self.noun}")
+        self.stdout.write(self.style.SUCCESS(f"Done: {total} {self.noun} deleted"))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.mail import BatchedMailSender, DatabaseMailQueue
+
+
+class Command(BaseCommand):
+    help = "Deliver emails queued in the OutboundEmail table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between polls when the queue is empty",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Drain the queue once and exit"
+        )
+
+    def handle(self, *args, **options):
+        queue = DatabaseMailQueue()
+        # One sender for the worker's lifetime, so its connection survives
+        # between polls until it goes idle
+        sender = BatchedMailSender(batch_size=options["batch_size"])
+        try:
+            while True:
+                sent = queue.drain(batch_size=options["batch_size"], sender=sender)
+                if sent:
+                    self.stdout.write(f"Sent {sent} emails: {sender.stats.as_dict()}")
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+        finally:
+            sender.close()
@@ -1,4 +1,11 @@
-from rest_framework.pagination import PageNumberPagination
+from base64 import b64decode, b64encode
+from urllib import parse
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
 from rest_framework.response import Response
 
 
@@ -7,6 +14,25 @@ class CustomPagination(PageNumberPagination):
     page_size_query_param = "per_page"
     max_page_size = 100
 
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for async views, using the async ORM."""
+        paginator = self.django_paginator_class(queryset, self.get_page_size(request))
+        # Paginator.count is a cached property; fill it without a sync query
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+
+        self.request = request
+        self.page.object_list = [obj async for obj in self.page.object_list]
+        return self.page.object_list
+
     def get_pagination_meta(self):
         return {
             "first_page": 1,
@@ -15,3 +41,130 @@ class CustomPagination(PageNumberPagination):
             "per_page": self.page.paginator.per_page,
             "total_count": self.page.paginator.count,
         }
+
+
+class CustomCursorPagination(BasePagination):
+    """
+    Keyset pagination over ``(created_at, id)``, newest first (oldest first
+    when ``descending`` is False).
+
+    Each page is fetched with a ``WHERE (created_at, id) < cursor`` filter
+    instead of ``COUNT(*)`` + ``OFFSET``, so every page costs the same.
+    """
+
+    page_size = 50
+    page_size_query_param = "per_page"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+    descending = True
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for async views, using the async ORM."""
+        return self.set_page([obj async for obj in self.page_queryset(queryset, request)])
+
+    def first_page(self, queryset):
+        """The first page at the default page size, regardless of the request."""
+        return self.set_page(list(self.keyset_queryset(queryset, self.page_size)))
+
+    async def afirst_page(self, queryset):
+        return self.set_page(
+            [obj async for obj in self.keyset_queryset(queryset, self.page_size)]
+        )
+
+    def page_queryset(self, queryset, request):
+        """Order and filter ``queryset`` down to the requested page plus one row."""
+        position, reverse = self.decode_cursor(request)
+        return self.keyset_queryset(
+            queryset, self.get_page_size(request), position, reverse
+        )
+
+    def keyset_queryset(self, queryset, per_page, position=None, reverse=False):
+        self.per_page, self.position, self.reverse = per_page, position, reverse
+
+        # Paging backwards reads the rows in the opposite order
+        lookup = "lt" if self.descending != reverse else "gt"
+        if lookup == "lt":
+            queryset = queryset.order_by("-created_at", "-id")
+        else:
+            queryset = queryset.order_by("created_at", "id")
+
+        if position is not None:
+            created_at, pk = position
+            queryset = queryset.filter(
+                Q(**{f"created_at__{lookup}": created_at})
+                | Q(created_at=created_at, **{f"id__{lookup}": pk})
+            )
+
+        return queryset[: per_page + 1]
+
+    def set_page(self, results):
+        has_more = len(results) > self.per_page
+        self.page = results[: self.per_page]
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_previous = has_more
+            self.has_next = True
+        else:
+            self.has_previous = self.position is not None
+            self.has_next = has_more
+        return self.page
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            querystring = b64decode(encoded.encode("ascii")).decode("ascii")
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            created_at = parse_datetime(tokens["p"][0])
+            pk = int(tokens["i"][0])
+            reverse = bool(int(tokens.get("r", ["0"])[0]))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return (created_at, pk), reverse
+
+    def encode_cursor(self, instance, reverse):
+        tokens = {"p": instance.created_at.isoformat(), "i": instance.pk}
+        if reverse:
+            tokens["r"] = "1"
+        querystring = parse.urlencode(tokens, doseq=True)
+        return b64encode(querystring.encode("ascii")).decode("ascii")
+
+    def get_next_cursor(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_cursor(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_pagination_meta(self):
+        return {
+            "next_cursor": self.get_next_cursor(),
+            "previous_cursor": self.get_previous_cursor(),
+            "per_page": self.per_page,
+        }
+
+    def get_paginated_response(self, data):
+        return Response({"pagination": self.get_pagination_meta(), "results": data})
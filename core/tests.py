@@ -1,3 +1,175 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .caching import InvalidatedCache
+from .mail import BatchedMailSender, DatabaseMailQueue
+from .models import OutboundEmail
+
+
+class MailQueueTests(TestCase):
+    def failing_send(self):
+        return mock.patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            side_effect=OSError("down"),
+        )
+
+    def test_register_queues_otp_mail(self):
+        response = APIClient().post(
+            reverse("register"),
+            {
+                "first_name": "New",
+                "last_name": "User",
+                "email": "new@example.com",
+                "password": "s3cret-pass",
+                "password2": "s3cret-pass",
+            },
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(mail.outbox, [])
+        queued = OutboundEmail.objects.get()
+        self.assertEqual((queued.to, queued.status), ("new@example.com", "pending"))
+
+        call_command("send_queued_mail", "--once", stdout=StringIO())
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["new@example.com"])
+        self.assertIn("Your OTP code is", mail.outbox[0].body)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, "sent")
+
+    def test_failed_sends_are_retried_then_given_up(self):
+        queue = DatabaseMailQueue()
+        email = queue.enqueue("a@example.com", "Subject", "Body")
+
+        with self.assertLogs("core.mail", "WARNING"), self.failing_send():
+            self.assertEqual(queue.drain(), 0)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ("pending", 1))
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertEqual(email.last_error, "down")
+
+        OutboundEmail.objects.filter(pk=email.pk).update(
+            attempts=queue.max_attempts - 1, next_attempt_at=timezone.now()
+        )
+        with self.assertLogs("core.mail", "WARNING"), self.failing_send():
+            queue.drain()
+        email.refresh_from_db()
+        self.assertEqual(email.status, "failed")
+        self.assertEqual(mail.outbox, [])
+
+    def test_abandoned_claims_are_picked_up_again(self):
+        queue = DatabaseMailQueue()
+        email = queue.enqueue("a@example.com", "Subject", "Body")
+        self.assertEqual(queue.claim(10), [email])
+        self.assertEqual(queue.claim(10), [])
+
+        OutboundEmail.objects.filter(pk=email.pk).update(
+            next_attempt_at=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(queue.drain(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts, email.body), ("sent", 2, ""))
+
+    def test_claims_that_keep_expiring_are_given_up(self):
+        queue = DatabaseMailQueue()
+        email = queue.enqueue("a@example.com", "Subject", "Body")
+        for _ in range(queue.max_attempts):
+            self.assertEqual(queue.claim(10), [email])
+            OutboundEmail.objects.filter(pk=email.pk).update(
+                next_attempt_at=timezone.now() - timedelta(seconds=1)
+            )
+
+        self.assertEqual(queue.claim(10), [])
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ("failed", queue.max_attempts))
+
+    def test_drain_prunes_old_rows(self):
+        queue = DatabaseMailQueue()
+        old, recent = (
+            queue.enqueue("a@example.com", "Subject", "Body") for _ in range(2)
+        )
+        OutboundEmail.objects.update(status="sent")
+        OutboundEmail.objects.filter(pk=old.pk).update(
+            created_at=timezone.now() - queue.retention - timedelta(hours=1)
+        )
+
+        queue.drain()
+        self.assertEqual(list(OutboundEmail.objects.all()), [recent])
+
+
+class BatchedMailSenderTests(TestCase):
+    def test_batches_share_connections(self):
+        queue = DatabaseMailQueue()
+        for i in range(120):
+            queue.enqueue(f"user{i}@example.com", "Subject", "Body")
+
+        sender = BatchedMailSender(batch_size=50)
+        with mock.patch.object(
+            sender.connection, "send_messages", wraps=sender.connection.send_messages
+        ) as send_messages:
+            self.assertEqual(queue.drain(batch_size=100, sender=sender), 120)
+
+        self.assertEqual(len(mail.outbox), 120)
+        self.assertEqual(
+            [len(call.args[0]) for call in send_messages.call_args_list], [50, 50, 20]
+        )
+        stats = sender.stats.as_dict()
+        self.assertEqual(stats["connections_opened"], 2)  # recycled after 100
+        self.assertEqual(stats["messages_per_connection"], 60)
+        self.assertEqual(stats["batches"], 3)
+
+    def test_failed_batch_isolates_bad_messages(self):
+        queue = DatabaseMailQueue()
+        good = queue.enqueue("good@example.com", "Subject", "Body")
+        bad = queue.enqueue("bad@example.com", "Subject", "Body")
+        sender = BatchedMailSender()
+        send_messages = sender.connection.send_messages
+
+        def fail_on_bad(messages):
+            if any(m.to == ["bad@example.com"] for m in messages):
+                raise OSError("rejected")
+            return send_messages(messages)
+
+        with mock.patch.object(sender.connection, "send_messages", fail_on_bad):
+            with self.assertLogs("core.mail", "WARNING"):
+                self.assertEqual(queue.drain(sender=sender), 1)
+
+        good.refresh_from_db()
+        bad.refresh_from_db()
+        self.assertEqual((good.status, bad.status), ("sent", "pending"))
+        self.assertEqual(sender.stats.messages_failed, 1)
+        self.assertEqual([m.to for m in mail.outbox], [["good@example.com"]])
+
+
+class InvalidatedCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.store = InvalidatedCache("EXAMPLE_CACHE", "EXAMPLE_CACHE_TIMEOUT")
+
+    def test_kept_briefly_without_a_shared_alias(self):
+        with mock.patch.object(cache, "set", wraps=cache.set) as cache_set:
+            self.store.set("key", 1)
+        self.assertEqual(cache_set.call_args.args[2], 60)
+
+        with override_settings(EXAMPLE_CACHE="default", EXAMPLE_CACHE_TIMEOUT=300):
+            with mock.patch.object(cache, "set", wraps=cache.set) as cache_set:
+                self.store.set("key", 1)
+        self.assertEqual(cache_set.call_args.args[2], 300)
+
+    def test_deleted_once_the_transaction_commits(self):
+        self.store.set("key", 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.store.delete_on_commit("key")
+            self.assertEqual(self.store.get("key"), 1)
+        self.assertIsNone(self.store.get("key"))
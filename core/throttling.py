@@ -0,0 +1,127 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket keyed by ``get_cache_key``. Each scope's rate ("5/min") in
+    REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"] is the bucket size, refilled
+    evenly over the period, so short bursts are allowed while the sustained
+    rate stays bounded.
+
+    Buckets live in the RATE_LIMIT_CACHE cache alias ("default" unless set).
+    Point it at a shared cache (Redis, Memcached) when running several
+    processes; the default local-memory cache limits each process separately.
+    Each bucket's read-modify-write holds a lock taken with ``cache.add``, so
+    concurrent requests can't spend the same token.
+    """
+
+    scope = None
+    durations = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    # Seconds before a lock left by a dead process expires
+    lock_timeout = 2
+    # Lock polls, lock_wait seconds apart, before the request is refused
+    lock_attempts = 50
+    lock_wait = 0.002
+
+    def __init__(self):
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        if rate is None:
+            raise ImproperlyConfigured(f"No throttle rate set for scope '{self.scope}'")
+        num, period = rate.split("/")
+        self.capacity = int(num)
+        self.refill_per_second = self.capacity / self.durations[period[0]]
+        self.cache = caches[getattr(settings, "RATE_LIMIT_CACHE", "default")]
+        self.tokens = self.capacity
+
+    def get_cache_key(self, request, view):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        key = f"throttle:{self.scope}:{key}"
+
+        lock = f"{key}:lock"
+        if not self.acquire(lock):
+            # Too busy to tell; refuse rather than let the burst through
+            self.tokens = 0
+            return False
+        try:
+            allowed = self.take(key)
+        finally:
+            self.cache.delete(lock)
+
+        # Read back by RateLimitHeadersMixin
+        limits = getattr(request, "rate_limits", [])
+        limits.append((self.capacity, int(self.tokens)))
+        request.rate_limits = limits
+        return allowed
+
+    def acquire(self, lock):
+        for _ in range(self.lock_attempts):
+            if self.cache.add(lock, 1, self.lock_timeout):
+                return True
+            time.sleep(self.lock_wait)
+        return False
+
+    def take(self, key):
+        """Refill the bucket at ``key`` and spend a token if there is one."""
+        now = time.time()
+        tokens, updated_at = self.cache.get(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated_at) * self.refill_per_second)
+
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self.tokens = tokens
+        # Expire once the bucket would be full again
+        timeout = (self.capacity - tokens) / self.refill_per_second + 1
+        self.cache.set(key, (tokens, now), timeout)
+        return allowed
+
+    def wait(self):
+        if self.tokens >= 1:
+            return None
+        return (1 - self.tokens) / self.refill_per_second
+
+
+class IPRateThrottle(TokenBucketThrottle):
+    """Limits requests per client IP."""
+
+    def get_cache_key(self, request, view):
+        return self.get_ident(request)
+
+
+class AccountRateThrottle(TokenBucketThrottle):
+    """Limits requests per account named in the request body."""
+
+    identifier_fields = ("email", "email_or_username")
+
+    def get_cache_key(self, request, view):
+        data = request.data if hasattr(request.data, "get") else {}
+        for field in self.identifier_fields:
+            value = data.get(field)
+            if isinstance(value, str) and value.strip():
+                return hashlib.sha256(value.strip().lower().encode()).hexdigest()
+        return None
+
+
+class RateLimitHeadersMixin:
+    """Reports the tightest applied limit as X-RateLimit-* headers."""
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        limits = getattr(request, "rate_limits", None)
+        if limits:
+            limit, remaining = min(limits, key=lambda item: item[1])
+            response["X-RateLimit-Limit"] = limit
+            response["X-RateLimit-Remaining"] = remaining
+        return response
@@ -8,9 +8,32 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
 import os
+import re
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todo.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up
+from todos.realtime import task_events_socket  # noqa: E402
+
+websocket_routes = [
+    (re.compile(r"^/ws/tasks/(?P<pk>\d+)/$"), task_events_socket),
+]
+
+
+async def websocket_application(scope, receive, send):
+    for pattern, handler in websocket_routes:
+        match = pattern.match(scope["path"])
+        if match:
+            return await handler(scope, receive, send, **match.groupdict())
+    await receive()  # websocket.connect
+    await send({"type": "websocket.close", "code": 4404})
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "websocket":
+        return await websocket_application(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -38,11 +38,18 @@ AUTH_USER_MODEL = "user.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "user.authentication.ClaimsJWTAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
+    # Token-bucket sizes per period for the auth endpoint throttles
+    "DEFAULT_THROTTLE_RATES": {
+        "login_ip": "30/min",
+        "login_account": "10/min",
+        "otp_ip": "20/hour",
+        "otp_account": "5/hour",
+    },
 }
 
 SIMPLE_JWT = {
@@ -53,6 +60,34 @@ SIMPLE_JWT = {
     "UPDATE_LAST_LOGIN": False,
 }
 
+# Task routes ("task-list-create", "task-detail") whose GET is served by the
+# async-native views in todos.async_views; only pays off under ASGI
+ASYNC_TASK_READS = []
+
+# How long deleted tasks are remembered for delta sync; clients that last
+# caught up earlier get 410 Gone and resync. Prune with prune_tombstones
+TASK_TOMBSTONE_RETENTION = timedelta(days=30)
+
+# Replies embedded under each comment in task details and comment pages;
+# clients can ask for fewer or more (up to 20) with ?replies=
+COMMENT_REPLY_PREVIEW = 3
+
+# Cache alias fronting refresh-token blacklist checks (see user.tokens). It
+# must be shared by all processes, so it stays off until one is configured
+TOKEN_BLACKLIST_CACHE = None
+
+# Cache alias recording which users exist and are active, so JWTs can be
+# authenticated from their claims (see user.authentication). Shared by all
+# processes or unset, in which case every request loads the user
+USER_STATE_CACHE = None
+
+# Cache aliases for data kept until it changes: task stats (todos.stats) and
+# serialized profiles (user.profile_cache). Invalidation only reaches the
+# configured cache, so use one shared by all processes; unset, each process
+# keeps entries in its default cache for a minute (see core.caching)
+TASK_STATS_CACHE = None
+PROFILE_CACHE = None
+
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -91,6 +126,10 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file (not shared-cache memory) so threaded tests get real locking
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
@@ -114,6 +153,11 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing uses Django's default PASSWORD_HASHERS. To switch, set
+# the list with the new hasher first and keep the old ones after it: stored
+# hashes are upgraded on the next successful login (see LoginView).
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -138,6 +182,13 @@ STATICFILES_DIRS = [
 # Media files
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+
+# Profile image uploads go straight to temporary files and stop being
+# written past UPLOAD_MAX_SIZE; non-JPEG images are decoded at full size,
+# so keep the pixel limit modest. See user.uploads
+UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+IMAGE_UPLOAD_MAX_PIXELS = 16_000_000
+IMAGE_MAX_DIMENSION = 2048
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
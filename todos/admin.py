@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import Task,Comment
+from .models import Task,Comment,TaskTombstone
 # Regisfrom .ter your models here.
 
 admin.site.register(Task)
-admin.site.register(Comment)
\ No newline at end of file
+admin.site.register(Comment)
+admin.site.register(TaskTombstone)
\ No newline at end of file
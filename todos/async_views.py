@@ -0,0 +1,136 @@
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from core.conditional import ConditionalGetMixin
+from core.responses import CustomResponse
+from user.authentication import ClaimsJWTAuthentication
+
+from .models import Task
+from .serializers import SampleTaskSerializer, TaskDetailSerializer
+from .threads import (
+    CommentCursorPagination,
+    attach_reply_previews,
+    preview_queryset,
+    reply_preview_size,
+    task_comments,
+)
+from .views import (
+    TASK_STATE_FIELDS,
+    TaskDetailView,
+    TaskListCreateView,
+    filter_tasks,
+    task_detail_validators,
+    task_list_etag,
+)
+
+
+class AsyncReadView(ConditionalGetMixin, View):
+    """
+    Serves GET on the event loop: JWT authentication from token claims and
+    the async ORM for queries. Responses are built like the sync views',
+    from ``CustomResponse`` and the DRF exception handler. Other methods are
+    handed to the sync DRF ``write_view``.
+
+    Only bearer tokens are accepted on GET; session authentication stays
+    with the sync views.
+    """
+
+    write_view = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method != "GET":
+            handler = sync_to_async(self.write_view.as_view())
+            return await handler(request, *args, **kwargs)
+
+        authenticator = ClaimsJWTAuthentication()
+        try:
+            authenticated = await authenticator.aauthenticate(request)
+            if authenticated is None:
+                raise NotAuthenticated()
+            request.user = authenticated[0]
+            request.query_params = Request(request).query_params
+            return await self.get(request, *args, **kwargs)
+        except Exception as exc:
+            return self.handle_exception(request, exc, authenticator, args, kwargs)
+
+    def handle_exception(self, request, exc, authenticator, args, kwargs):
+        """The error response the sync views would give, as APIView does."""
+        if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+            exc.auth_header = authenticator.authenticate_header(request)
+        context = {"view": self, "args": args, "kwargs": kwargs, "request": request}
+        response = api_settings.EXCEPTION_HANDLER(exc, context)
+        if response is None:
+            raise exc
+        return self.render(response)
+
+    def render(self, response):
+        """Render a DRF ``Response``, e.g. a ``CustomResponse``, as JSON."""
+        response.accepted_renderer = JSONRenderer()
+        response.accepted_media_type = response.accepted_renderer.media_type
+        response.renderer_context = {}
+        return response.render()
+
+
+class AsyncTaskListView(AsyncReadView):
+    write_view = TaskListCreateView
+
+    async def get(self, request):
+        tasks = filter_tasks(
+            Task.objects.filter(owner=request.user), request.query_params
+        )
+        paginator = TaskListCreateView().get_paginator(request)
+        page = await paginator.apaginate_queryset(tasks, request)
+        pagination = paginator.get_pagination_meta()
+        etag = task_list_etag(request, page, pagination)
+        not_modified = self.not_modified(request, etag)
+        if not_modified:
+            return not_modified
+
+        data = SampleTaskSerializer(page, many=True, context={"request": request}).data
+        response = self.render(
+            CustomResponse(data=data, status=status.HTTP_200_OK, pagination=pagination)
+        )
+        return self.set_validators(response, etag)
+
+
+class AsyncTaskDetailView(AsyncReadView):
+    write_view = TaskDetailView
+
+    async def get(self, request, pk):
+        state = await (
+            Task.objects.filter(pk=pk, owner=request.user)
+            .with_comment_state()
+            .values(*TASK_STATE_FIELDS)
+            .afirst()
+        )
+        if state is None:
+            raise Http404
+
+        etag, last_modified = task_detail_validators(request, pk, state)
+        not_modified = self.not_modified(request, etag, last_modified)
+        if not_modified:
+            return not_modified
+
+        task = await Task.objects.filter(pk=pk, owner=request.user).afirst()
+        if task is None:
+            raise Http404
+        paginator = CommentCursorPagination()
+        task.comment_count = state["comment_count"] or 0
+        task.comment_page = await paginator.afirst_page(task_comments(task.pk))
+        previews = preview_queryset(task.comment_page, reply_preview_size(request))
+        attach_reply_previews(task.comment_page, [reply async for reply in previews])
+        task.comments_cursor = paginator.get_next_cursor()
+        data = TaskDetailSerializer(task, context={"request": request}).data
+        response = self.render(CustomResponse(data=data, status=status.HTTP_200_OK))
+        return self.set_validators(response, etag, last_modified)
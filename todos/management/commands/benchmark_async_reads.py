@@ -0,0 +1,141 @@
+import asyncio
+import statistics
+import time
+import uuid
+from types import ModuleType
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from django.urls import include, path
+
+from core.benchmarks import scratch_database
+from todo.asgi import application
+from todos.models import Comment, CommentLike, Task
+from todos.urls import task_urlpatterns
+from user.models import User
+from user.tokens import RefreshToken
+
+
+def urlconf(async_reads):
+    module = ModuleType(f"benchmark_urls_{'async' if async_reads else 'sync'}")
+    module.urlpatterns = [path("api/todo/", include(task_urlpatterns(async_reads)))]
+    return module
+
+
+async def asgi_get(path, token):
+    """Send one GET through the ASGI application and return its latency in ms."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"testserver"),
+            (b"authorization", f"Bearer {token}".encode()),
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    finished = asyncio.Event()
+    request_sent = False
+    status = None
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    started = time.perf_counter()
+    await application(scope, receive, send)
+    elapsed = (time.perf_counter() - started) * 1000
+    finished.set()
+    if status != 200:
+        raise RuntimeError(f"GET {path} returned {status}")
+    return elapsed
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the sync and async task list/detail reads through "
+        "todo.asgi in-process, reporting requests/s and p50/p99 latency, "
+        "in a scratch copy of the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=500)
+        parser.add_argument("--comments", type=int, default=50)
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=32)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.benchmark(options)
+
+    def benchmark(self, options):
+        owner, detail_task = self.seed(options["tasks"], options["comments"])
+        token = str(RefreshToken.for_user(owner).access_token)
+        endpoints = [
+            ("list", "/api/todo/"),
+            ("detail", f"/api/todo/{detail_task.pk}/"),
+        ]
+        self.stdout.write(
+            f"{options['requests']} requests per run, concurrency "
+            f"{options['concurrency']} ({connection.vendor})"
+        )
+        for name, url in endpoints:
+            for mode, async_reads in (
+                ("sync", ()),
+                ("async", ("task-list-create", "task-detail")),
+            ):
+                with override_settings(ROOT_URLCONF=urlconf(async_reads)):
+                    timings, wall = asyncio.run(
+                        self.load(url, token, options["requests"], options["concurrency"])
+                    )
+                p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+                self.stdout.write(
+                    f"{name:<7} {mode:<6} {len(timings) / wall:8.1f} req/s   "
+                    f"p50 {statistics.median(timings):7.2f} ms   p99 {p99:7.2f} ms"
+                )
+
+    async def load(self, url, token, requests, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                return await asgi_get(url, token)
+
+        await asgi_get(url, token)  # warm up
+        started = time.perf_counter()
+        timings = await asyncio.gather(*(one() for _ in range(requests)))
+        return sorted(timings), time.perf_counter() - started
+
+    def seed(self, tasks, comments):
+        tag = uuid.uuid4().hex[:8]
+        owner = User.objects.create_user("Bench", "Reads", f"bench-{tag}@example.com")
+        User.objects.filter(pk=owner.pk).update(is_active=True)
+        owner.refresh_from_db()
+        created = Task.objects.bulk_create(
+            Task(owner=owner, title=f"Benchmark task {i}") for i in range(tasks)
+        )
+        detail_task = created[0]
+        thread = Comment.objects.bulk_create(
+            Comment(task=detail_task, created_by=owner, content=f"Comment {i}")
+            for i in range(comments)
+        )
+        for comment in thread[:10]:
+            CommentLike.objects.toggle(comment.pk, owner, "like")
+        return owner, detail_task
@@ -0,0 +1,111 @@
+import random
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.benchmarks import scratch_database
+from todos.models import Task
+from todos.views import TaskListCreateView
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a large task table and time TaskListCreateView for the filter "
+        "combinations it supports, in a scratch copy of the database."
+    )
+
+    scenarios = [
+        ("all", {}),
+        ("status", {"status": "done"}),
+        ("priority", {"priority": "high"}),
+        ("status+priority", {"status": "todo", "priority": "critical"}),
+        ("date range", {"start_date": "{start}", "end_date": "{end}"}),
+        ("deep page", {"page": "{deep_page}"}),
+        ("cursor", {"pagination": "cursor"}),
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument(
+            "--users", type=int, default=10, help="Owners the rows are spread over"
+        )
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.benchmark(options)
+
+    def benchmark(self, options):
+        owners = self.seed(options["rows"], options["users"])
+        owner = owners[0]
+        count = Task.objects.filter(owner=owner).count()
+        newest = timezone.now().date()
+        context = {
+            "start": (newest - timedelta(days=30)).isoformat(),
+            "end": newest.isoformat(),
+            "deep_page": max(count // 50 - 1, 1),
+        }
+
+        self.stdout.write(
+            f"{options['rows']} rows, {count} owned by the measured user "
+            f"({connection.vendor})"
+        )
+        factory = APIRequestFactory()
+        view = TaskListCreateView.as_view()
+        for name, params in self.scenarios:
+            params = {k: v.format(**context) for k, v in params.items()}
+            timings = []
+            for _ in range(options["repeat"]):
+                request = factory.get("/api/todo/", params)
+                force_authenticate(request, user=owner)
+                started = time.perf_counter()
+                response = view(request)
+                response.render()
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f"{name:<16} p50 {statistics.median(timings):8.2f} ms   "
+                f"max {timings[-1]:8.2f} ms"
+            )
+
+    def seed(self, rows, users):
+        tag = uuid.uuid4().hex[:8]
+        owners = [
+            User.objects.create_user("Bench", str(i), f"bench-{tag}-{i}@example.com")
+            for i in range(users)
+        ]
+        statuses = [choice for choice, _ in Task.STATUS_CHOICES]
+        priorities = [choice for choice, _ in Task.PRIORITY_CHOICES]
+        now = timezone.now()
+
+        batch = []
+        for i in range(rows):
+            batch.append(
+                Task(
+                    owner=owners[i % users],
+                    title=f"Benchmark task {i}",
+                    description="Seeded by benchmark_task_list",
+                    status=random.choice(statuses),
+                    priority=random.choice(priorities),
+                )
+            )
+            if len(batch) == 10_000:
+                self.insert(batch, now, offset=i + 1 - len(batch))
+                batch = []
+        self.insert(batch, now, offset=rows - len(batch))
+        return owners
+
+    def insert(self, tasks, now, offset):
+        # created_at is auto_now_add, so bulk_create stamps every row with the
+        # current time; spread them back over a minute each afterwards
+        tasks = Task.objects.bulk_create(tasks)
+        for i, task in enumerate(tasks, start=offset):
+            task.created_at = now - timedelta(minutes=i)
+        Task.objects.bulk_update(tasks, ["created_at"], batch_size=1000)
@@ -0,0 +1,13 @@
+from django.utils import timezone
+
+from core.management.base import BatchDeleteCommand
+from todos.models import TaskTombstone, tombstone_retention
+
+
+class Command(BatchDeleteCommand):
+    description = "Delete task tombstones older than TASK_TOMBSTONE_RETENTION"
+    noun = "tombstones"
+
+    def get_queryset(self):
+        cutoff = timezone.now() - tombstone_retention()
+        return TaskTombstone.objects.filter(deleted_at__lt=cutoff)
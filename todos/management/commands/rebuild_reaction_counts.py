@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from todos.models import Comment, CommentLike
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized reaction counters on every comment."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        fields = Comment.reaction_fields()
+        updated = 0
+        with transaction.atomic():
+            counts = {}
+            rows = CommentLike.objects.values("comment_id", "reaction_type").annotate(
+                total=Count("id")
+            )
+            for row in rows:
+                comment_counts = counts.setdefault(row["comment_id"], {})
+                comment_counts[row["reaction_type"]] = row["total"]
+
+            comments = Comment.objects.only("id", *fields)
+            batch = []
+            for comment in comments.iterator(chunk_size=options["batch_size"]):
+                comment_counts = counts.get(comment.pk, {})
+                changed = False
+                for reaction_type, _ in CommentLike.REACTION_CHOICES:
+                    field = Comment.reaction_field(reaction_type)
+                    value = comment_counts.get(reaction_type, 0)
+                    if getattr(comment, field) != value:
+                        setattr(comment, field, value)
+                        changed = True
+                if changed:
+                    batch.append(comment)
+                if len(batch) >= options["batch_size"]:
+                    Comment.objects.bulk_update(batch, fields)
+                    updated += len(batch)
+                    batch = []
+            Comment.objects.bulk_update(batch, fields)
+            updated += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt reaction counts on {updated} comments"))
@@ -0,0 +1,72 @@
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE todos_task_fts USING fts5(
+        title, description, content='todos_task', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER todos_task_fts_insert AFTER INSERT ON todos_task BEGIN
+        INSERT INTO todos_task_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER todos_task_fts_delete AFTER DELETE ON todos_task BEGIN
+        INSERT INTO todos_task_fts(todos_task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER todos_task_fts_update AFTER UPDATE OF title, description
+    ON todos_task BEGIN
+        INSERT INTO todos_task_fts(todos_task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO todos_task_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO todos_task_fts(todos_task_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS todos_task_fts_insert",
+    "DROP TRIGGER IF EXISTS todos_task_fts_delete",
+    "DROP TRIGGER IF EXISTS todos_task_fts_update",
+    "DROP TABLE IF EXISTS todos_task_fts",
+]
+
+# The expression must match todos.search.PostgresTaskSearch.vector
+POSTGRES_FORWARD = [
+    """
+    CREATE INDEX todos_task_search_idx ON todos_task USING GIN (
+        to_tsvector('english',
+            coalesce(title, '') || ' ' || coalesce(description, ''))
+    )
+    """,
+]
+
+POSTGRES_BACKWARD = ["DROP INDEX IF EXISTS todos_task_search_idx"]
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todos', '0003_task_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor({"sqlite": SQLITE_FORWARD, "postgresql": POSTGRES_FORWARD}),
+            run_for_vendor({"sqlite": SQLITE_BACKWARD, "postgresql": POSTGRES_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.3 on 2026-10-18 01:26
+
+from django.db import migrations, models
+
+
+def count_existing_reactions(apps, schema_editor):
+    Comment = apps.get_model("todos", "Comment")
+    CommentLike = apps.get_model("todos", "CommentLike")
+    rows = CommentLike.objects.values("comment_id", "reaction_type").annotate(
+        total=models.Count("id")
+    )
+    for row in rows:
+        Comment.objects.filter(pk=row["comment_id"]).update(
+            **{f"{row['reaction_type']}_reactions": row["total"]}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todos', '0004_task_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='angry_reactions',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='haha_reactions',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='like_reactions',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='love_reactions',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='sad_reactions',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='wow_reactions',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_existing_reactions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,101 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+import todos.models
+
+# Rebuild the FTS5 table with an UNINDEXED "id" column (read from todos_task,
+# as the table has external content) for TaskSearchIndex to join on. FTS5
+# can't look rows up by that column, so SQLite always drives a search from
+# MATCH instead of re-running it for every task of the owner.
+TRIGGERS = [
+    """
+    CREATE TRIGGER todos_task_fts_insert AFTER INSERT ON todos_task BEGIN
+        INSERT INTO todos_task_fts(rowid, {columns})
+        VALUES (new.id, {new});
+    END
+    """,
+    """
+    CREATE TRIGGER todos_task_fts_delete AFTER DELETE ON todos_task BEGIN
+        INSERT INTO todos_task_fts(todos_task_fts, rowid, {columns})
+        VALUES ('delete', old.id, {old});
+    END
+    """,
+    """
+    CREATE TRIGGER todos_task_fts_update AFTER UPDATE OF title, description
+    ON todos_task BEGIN
+        INSERT INTO todos_task_fts(todos_task_fts, rowid, {columns})
+        VALUES ('delete', old.id, {old});
+        INSERT INTO todos_task_fts(rowid, {columns})
+        VALUES (new.id, {new});
+    END
+    """,
+]
+
+DROP = [
+    "DROP TRIGGER IF EXISTS todos_task_fts_insert",
+    "DROP TRIGGER IF EXISTS todos_task_fts_delete",
+    "DROP TRIGGER IF EXISTS todos_task_fts_update",
+    "DROP TABLE IF EXISTS todos_task_fts",
+]
+
+
+def create(columns, definition):
+    return [
+        *DROP,
+        f"""
+        CREATE VIRTUAL TABLE todos_task_fts USING fts5(
+            {definition}, content='todos_task', content_rowid='id'
+        )
+        """,
+        *(
+            sql.format(
+                columns=", ".join(columns),
+                new=", ".join(f"new.{c}" for c in columns),
+                old=", ".join(f"old.{c}" for c in columns),
+            )
+            for sql in TRIGGERS
+        ),
+        "INSERT INTO todos_task_fts(todos_task_fts) VALUES ('rebuild')",
+    ]
+
+
+SQLITE_FORWARD = create(
+    ["id", "title", "description"], "id UNINDEXED, title, description"
+)
+SQLITE_BACKWARD = create(["title", "description"], "title, description")
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == "sqlite":
+            for sql in statements:
+                schema_editor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todos', '0008_tombstone_sync_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_sqlite(SQLITE_FORWARD), run_on_sqlite(SQLITE_BACKWARD)
+        ),
+        migrations.CreateModel(
+            name='TaskSearchIndex',
+            fields=[
+                ('task', models.OneToOneField(db_column='id', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='fts', serialize=False, to='todos.task')),
+                ('document', todos.models.SearchDocumentField(db_column='todos_task_fts')),
+                ('title', models.TextField()),
+                ('description', models.TextField()),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'todos_task_fts',
+                'managed': False,
+            },
+        ),
+    ]
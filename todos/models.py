@@ -1,5 +1,60 @@
-from django.db import models
-from user.models import User
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery, Window
+from django.db.models.functions import Coalesce, RowNumber
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from user.models import User, UserProfile
+
+
+class TaskQuerySet(models.QuerySet):
+    def with_comment_state(self):
+        # Cheap fingerprint of a task's comment thread (counts and latest
+        # changes of comments, reactions and the profiles of their authors,
+        # which are embedded too), used for conditional GETs.
+        comments = Comment.objects.filter(task=OuterRef("pk")).order_by().values("task")
+        likes = (
+            CommentLike.objects.filter(comment__task=OuterRef("pk"))
+            .order_by()
+            .values("comment__task")
+        )
+        return self.annotate(
+            comment_count=Subquery(comments.annotate(n=Count("pk")).values("n")),
+            comments_updated_at=Subquery(
+                comments.annotate(last=Max("updated_at")).values("last")
+            ),
+            reaction_count=Subquery(likes.annotate(n=Count("pk")).values("n")),
+            reactions_updated_at=Subquery(
+                likes.annotate(last=Max("updated_at")).values("last")
+            ),
+            authors_updated_at=Subquery(
+                comments.annotate(
+                    last=Max("created_by__userprofile__updated_at")
+                ).values("last")
+            ),
+            likers_updated_at=Subquery(
+                likes.annotate(last=Max("created_by__userprofile__updated_at")).values(
+                    "last"
+                )
+            ),
+        )
+
+
+# Fields of a user shown with their profile in comments and likes
+PROFILE_USER_FIELDS = {"first_name", "last_name", "username"}
+
+
+@receiver(post_save, sender=User)
+def touch_profile(sender, instance, created, update_fields=None, **kwargs):
+    # Bump the profile's updated_at when the name embedded with it changes,
+    # so with_comment_state (and the task detail ETag) notices
+    if created or (update_fields and PROFILE_USER_FIELDS.isdisjoint(update_fields)):
+        return
+    UserProfile.objects.filter(user=instance).update(updated_at=timezone.now())
+
 
 # Create your models here.
 class Task(models.Model):
@@ -25,13 +80,150 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = TaskQuerySet.as_manager()
+
     class Meta:
         ordering = ("-created_at",)
+        # Match the filters TaskListCreateView issues: every list is scoped to
+        # the owner, optionally narrowed by status/priority and a created_at
+        # range, and ordered newest first.
+        indexes = [
+            models.Index(
+                fields=["owner", "-created_at", "-id"], name="task_owner_created_idx"
+            ),
+            models.Index(
+                fields=["owner", "status", "-created_at"],
+                name="task_owner_status_idx",
+            ),
+            models.Index(
+                fields=["owner", "priority", "-created_at"],
+                name="task_owner_priority_idx",
+            ),
+            models.Index(
+                fields=["owner", "status", "priority", "-created_at"],
+                name="task_owner_status_prio_idx",
+            ),
+            models.Index(
+                fields=["owner", "updated_at", "id"], name="task_owner_updated_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
 
+class Match(models.Lookup):
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", [*lhs_params, *rhs_params]
+
+
+class SearchDocumentField(models.TextField):
+    """An FTS5 table's hidden column named after the table, which MATCH takes."""
+
+
+SearchDocumentField.register_lookup(Match)
+
+
+class TaskSearchIndex(models.Model):
+    """
+    A row of the FTS5 table that migrations 0004_task_search and
+    0009_task_search_index keep in sync with todos_task via triggers (SQLite
+    only). Joined to its task on the unindexed ``id`` column, so searches
+    filter and rank in one pass driven by MATCH.
+    """
+
+    task = models.OneToOneField(
+        Task,
+        primary_key=True,
+        db_column="id",
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+        related_name="fts",
+    )
+    document = SearchDocumentField(db_column="todos_task_fts")
+    title = models.TextField()
+    description = models.TextField()
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "todos_task_fts"
+
+
+def tombstone_retention():
+    return getattr(settings, "TASK_TOMBSTONE_RETENTION", timedelta(days=30))
+
+
+class TaskTombstone(models.Model):
+    """
+    Marks a deleted task so delta sync can tell clients to drop it. Kept for
+    ``tombstone_retention()``; see the prune_tombstones command.
+    """
+
+    owner = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="task_tombstones"
+    )
+    task_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["owner", "id"], name="tombstone_owner_id_idx"),
+            models.Index(fields=["deleted_at"], name="tombstone_deleted_idx"),
+        ]
+
+    def __str__(self):
+        return f"Task {self.task_id} deleted on {self.deleted_at}"
+
+
+class CommentLikeQuerySet(models.QuerySet):
+    def toggle(self, comment_id, user, reaction_type):
+        """
+        Add, switch or remove ``user``'s reaction on a comment and return the
+        action taken: "added", "updated" or "removed". Raises
+        ``Comment.DoesNotExist`` if the comment is gone.
+
+        Each toggle starts by writing to the comment row, which locks it (and
+        takes SQLite's write lock before anything is read, so the transaction
+        waits for the lock instead of failing), so parallel toggles apply one
+        after another and the comment can't be deleted midway. Two requests
+        both adding the first reaction race on the unique constraint instead;
+        the loser retries and then sees the winner's row.
+        """
+        for attempt in range(3):
+            try:
+                with transaction.atomic():
+                    if not Comment.objects.filter(pk=comment_id).update(
+                        like_reactions=F("like_reactions")
+                    ):
+                        raise Comment.DoesNotExist("Comment not found")
+                    like = (
+                        self.select_for_update()
+                        .filter(comment_id=comment_id, created_by=user)
+                        .first()
+                    )
+                    if like is None:
+                        self.create(
+                            comment_id=comment_id,
+                            created_by=user,
+                            reaction_type=reaction_type,
+                        )
+                        return "added"
+                    if like.reaction_type == reaction_type:
+                        like.delete()
+                        return "removed"
+                    like.reaction_type = reaction_type
+                    like.save(update_fields=["reaction_type", "updated_at"])
+                    return "updated"
+            except IntegrityError:
+                if attempt == 2:
+                    raise
+
+
 class CommentLike(models.Model):
     REACTION_CHOICES = (
         ("like", "👍"),
@@ -52,6 +244,8 @@ class CommentLike(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CommentLikeQuerySet.as_manager()
+
     class Meta:
         unique_together = [
             "created_by",
@@ -62,6 +256,41 @@ class CommentLike(models.Model):
         return f"{self.get_reaction_type_display()} reaction by {self.created_by.username} on {self.created_at}"
 
 
+class CommentQuerySet(models.QuerySet):
+    def with_related(self):
+        return self.select_related("created_by__userprofile").prefetch_related(
+            models.Prefetch(
+                "likes",
+                queryset=CommentLike.objects.select_related(
+                    "created_by__userprofile"
+                ),
+            )
+        )
+
+    def with_reply_count(self):
+        replies = Comment.objects.filter(parent=OuterRef("pk")).order_by().values("parent")
+        return self.annotate(
+            reply_count=Coalesce(
+                Subquery(replies.annotate(n=Count("pk")).values("n")), 0
+            )
+        )
+
+    def reply_previews(self, parent_ids, size):
+        """The first ``size`` replies to each of ``parent_ids``, oldest first."""
+        return (
+            self.filter(parent_id__in=parent_ids)
+            .annotate(
+                position=Window(
+                    RowNumber(),
+                    partition_by=F("parent_id"),
+                    order_by=(F("created_at").asc(), F("id").asc()),
+                )
+            )
+            .filter(position__lte=size)
+            .order_by("created_at", "id")
+        )
+
+
 class Comment(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="comments")
@@ -69,11 +298,54 @@ class Comment(models.Model):
         "self", null=True, blank=True, on_delete=models.CASCADE, related_name="replies"
     )  # For replies
     content = models.TextField(null=True, blank=True)
+    # Denormalized reaction counters, maintained by the CommentLike signals
+    # below; rebuild with `manage.py rebuild_reaction_counts`.
+    like_reactions = models.PositiveIntegerField(default=0)
+    love_reactions = models.PositiveIntegerField(default=0)
+    haha_reactions = models.PositiveIntegerField(default=0)
+    wow_reactions = models.PositiveIntegerField(default=0)
+    sad_reactions = models.PositiveIntegerField(default=0)
+    angry_reactions = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ("-created_at",)
+        # Keyset pages of a task's top-level comments and of a comment's
+        # replies; see todos.threads.
+        indexes = [
+            models.Index(
+                fields=["task", "parent", "created_at", "id"],
+                name="comment_task_thread_idx",
+            ),
+            models.Index(
+                fields=["parent", "created_at", "id"], name="comment_replies_idx"
+            ),
+        ]
+
+    @staticmethod
+    def reaction_field(reaction_type):
+        return f"{reaction_type}_reactions"
+
+    @classmethod
+    def reaction_fields(cls):
+        return [
+            cls.reaction_field(reaction_type)
+            for reaction_type, _ in CommentLike.REACTION_CHOICES
+        ]
+
+    @property
+    def reaction_counts(self):
+        return {
+            reaction_type: getattr(self, self.reaction_field(reaction_type))
+            for reaction_type, _ in CommentLike.REACTION_CHOICES
+        }
+
+    @property
+    def reaction_total(self):
+        return sum(self.reaction_counts.values())
 
     @property
     def is_reply(self):
@@ -84,3 +356,42 @@ class Comment(models.Model):
             return f"Reply by {self.created_by.username} on {self.created_at}"
         return f"Comment by {self.created_by.username} on {self.created_at}"
 
+
+@receiver(post_delete, sender=Task)
+def record_task_tombstone(sender, instance, origin=None, **kwargs):
+    # Only deletes that start at a task (or task queryset) need a tombstone;
+    # tasks removed together with their owner have nobody left to sync.
+    origin_model = origin.model if isinstance(origin, models.QuerySet) else type(origin)
+    if origin_model is Task:
+        TaskTombstone.objects.create(owner_id=instance.owner_id, task_id=instance.pk)
+
+
+def update_reaction_count(comment_id, reaction_type, delta):
+    field = Comment.reaction_field(reaction_type)
+    Comment.objects.filter(pk=comment_id).update(**{field: F(field) + delta})
+
+
+@receiver(post_init, sender=CommentLike)
+def remember_reaction_type(sender, instance, **kwargs):
+    # Read from __dict__ so deferred loads don't trigger a query
+    instance._saved_reaction_type = (
+        instance.__dict__.get("reaction_type") if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=CommentLike)
+def count_reaction(sender, instance, created, **kwargs):
+    previous = instance._saved_reaction_type
+    if previous != instance.reaction_type:
+        if previous and not created:
+            update_reaction_count(instance.comment_id, previous, -1)
+        update_reaction_count(instance.comment_id, instance.reaction_type, 1)
+    instance._saved_reaction_type = instance.reaction_type
+
+
+@receiver(post_delete, sender=CommentLike)
+def uncount_reaction(sender, instance, **kwargs):
+    update_reaction_count(
+        instance.comment_id, instance._saved_reaction_type or instance.reaction_type, -1
+    )
+
@@ -0,0 +1,82 @@
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from core.broadcast import get_broadcast
+from user.authentication import ClaimsJWTAuthentication
+
+from .models import Task
+
+COMMENT_ADDED = "comment-added"
+COMMENT_UPDATED = "comment-updated"
+COMMENT_DELETED = "comment-deleted"
+REACTION_CHANGED = "reaction-changed"
+
+
+def task_group(task_id):
+    return f"task:{task_id}"
+
+
+def publish_task_event(task_id, event, data):
+    """Push ``event`` to the task's WebSocket subscribers once committed."""
+    message = json.dumps(
+        {"type": event, "task": task_id, "data": data}, cls=DjangoJSONEncoder
+    )
+    transaction.on_commit(lambda: get_broadcast().publish(task_group(task_id), message))
+
+
+def authenticate_socket(scope):
+    """
+    Return the user for the access token in the ``token`` query parameter
+    (browsers can't set headers on WebSockets) or the Authorization header.
+    """
+    authentication = ClaimsJWTAuthentication()
+    raw_token = parse_qs(scope.get("query_string", b"").decode()).get("token", [None])[0]
+    if raw_token is None:
+        header = dict(scope.get("headers", [])).get(b"authorization")
+        raw_token = header and authentication.get_raw_token(header)
+    if not raw_token:
+        return None
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        return None
+
+
+async def task_events_socket(scope, receive, send, pk):
+    """
+    WebSocket at /ws/tasks/<pk>/ streaming the task's comment and reaction
+    events to its owner as JSON text frames. Messages from the client are
+    ignored.
+    """
+    if (await receive())["type"] != "websocket.connect":
+        return
+
+    user = await sync_to_async(authenticate_socket)(scope)
+    if user is None:
+        await send({"type": "websocket.close", "code": 4401})
+        return
+    if not await Task.objects.filter(pk=pk, owner_id=user.pk).aexists():
+        await send({"type": "websocket.close", "code": 4404})
+        return
+
+    # Subscribe before accepting, so no event falls between the two
+    async with get_broadcast().subscribe(task_group(pk)) as events:
+        await send({"type": "websocket.accept"})
+
+        async def forward():
+            async for message in events:
+                await send({"type": "websocket.send", "text": message})
+
+        forwarder = asyncio.ensure_future(forward())
+        try:
+            while (await receive())["type"] != "websocket.disconnect":
+                pass
+        finally:
+            forwarder.cancel()
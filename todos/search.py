@@ -0,0 +1,92 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, F, FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+SEARCH_CONFIG = "english"
+
+word_re = re.compile(r"\w+")
+
+
+class IContainsTaskSearch:
+    """Fallback search: case-insensitive substring match, no ranking."""
+
+    def search(self, queryset, query):
+        return queryset.filter(
+            Q(title__icontains=query) | Q(description__icontains=query)
+        )
+
+
+class SQLiteFTSTaskSearch(IContainsTaskSearch):
+    """Ranked prefix search joined through ``TaskSearchIndex``."""
+
+    def search(self, queryset, query):
+        words = word_re.findall(query)
+        if not words:
+            return super().search(queryset, query)
+
+        # Every word must match, as a prefix: "foo"* "bar"*
+        match = " ".join('"%s"*' % word for word in words)
+        return (
+            queryset.filter(fts__document__match=match)
+            .annotate(search_rank=F("fts__rank"))
+            .order_by("search_rank")
+        )
+
+
+class PostgresTaskSearch(IContainsTaskSearch):
+    """
+    Ranked prefix search against the tsvector expression that migration
+    0004_task_search covers with a GIN index.
+    """
+
+    # Must stay identical to the indexed expression for the index to be used
+    vector = (
+        f"to_tsvector('{SEARCH_CONFIG}', "
+        f"coalesce({Task._meta.db_table}.title, '') || ' ' || "
+        f"coalesce({Task._meta.db_table}.description, ''))"
+    )
+
+    def search(self, queryset, query):
+        words = word_re.findall(query)
+        if not words:
+            return super().search(queryset, query)
+
+        tsquery = " & ".join(f"{word}:*" for word in words)
+        matches = RawSQL(
+            f"{self.vector} @@ to_tsquery('{SEARCH_CONFIG}', %s)",
+            [tsquery],
+            output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            f"ts_rank({self.vector}, to_tsquery('{SEARCH_CONFIG}', %s))",
+            [tsquery],
+            output_field=FloatField(),
+        )
+        return (
+            queryset.filter(matches)
+            .annotate(search_rank=rank)
+            .order_by("-search_rank")
+        )
+
+
+vendor_backends = {
+    "sqlite": SQLiteFTSTaskSearch,
+    "postgresql": PostgresTaskSearch,
+}
+
+
+def get_task_search_backend():
+    """
+    Return the search backend named by settings.TASK_SEARCH_BACKEND, or the
+    one matching the database vendor, falling back to IContainsTaskSearch.
+    """
+    backend = getattr(settings, "TASK_SEARCH_BACKEND", None)
+    if backend:
+        return import_string(backend)()
+    return vendor_backends.get(connection.vendor, IContainsTaskSearch)()
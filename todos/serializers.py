@@ -1,3 +1,5 @@
+from collections import Counter
+
 from rest_framework import serializers
 
 from user.models import User, UserProfile
@@ -13,7 +15,7 @@ class SampleUserProfileData(serializers.ModelSerializer):
 
     def get_profile_picture(self, obj):
         request = self.context.get("request")
-        url = obj.get_profile_picture
+        url = obj.get_profile_picture_thumbnail
         return request.build_absolute_uri(url) if request else url
 
 
@@ -35,9 +37,19 @@ class CommentLikeSerializer(serializers.ModelSerializer):
 
 
 class CommentSerializer(serializers.ModelSerializer):
+    """
+    A comment with a preview of its direct replies rather than the whole
+    subtree (see ``todos.threads``). ``reply_count`` counts all direct
+    replies; the rest come from the replies endpoint, starting at
+    ``replies_cursor``.
+    """
+
     created_by = SampleUserData(read_only=True)
     replies = serializers.SerializerMethodField()
-    like_count = serializers.SerializerMethodField()
+    reply_count = serializers.IntegerField(read_only=True, default=0)
+    replies_cursor = serializers.CharField(read_only=True, allow_null=True)
+    like_count = serializers.IntegerField(source="reaction_total", read_only=True)
+    reaction_counts = serializers.DictField(read_only=True)
     likes = serializers.SerializerMethodField()
 
     class Meta:
@@ -49,24 +61,26 @@ class CommentSerializer(serializers.ModelSerializer):
             "parent",
             "content",
             "replies",
+            "reply_count",
+            "replies_cursor",
             "likes",  # <-- Add likes field (optional)
             "like_count",  # <-- Add like_count field (optional)
+            "reaction_counts",
             "created_at",
             "updated_at",
         ]
         read_only_fields = ["id", "created_by", "task", "created_at", "updated_at"]
 
     def get_replies(self, obj):
-        replies = obj.replies.all()  # Get all replies (children)
+        replies = getattr(obj, "preview_replies", [])
         return CommentSerializer(replies, many=True, context=self.context).data
 
-    def get_like_count(self, obj):
-        return obj.likes.count()
-
     def get_likes(self, obj):
-        likes = obj.likes.select_related(
-            "created_by", "created_by__userprofile"
-        )  # Avoid N+1 queries
+        likes = obj.likes.all()
+        if "likes" not in getattr(obj, "_prefetched_objects_cache", {}):
+            likes = likes.select_related(
+                "created_by", "created_by__userprofile"
+            )  # Avoid N+1 queries
         data = []
 
         for like in likes:
@@ -76,7 +90,7 @@ class CommentSerializer(serializers.ModelSerializer):
 
             if hasattr(user, "userprofile") and user.userprofile.profile_picture:
                 profile_picture_url = request.build_absolute_uri(
-                    user.userprofile.get_profile_picture
+                    user.userprofile.get_profile_picture_thumbnail
                 )
             else:
                 # fallback if no profile or no picture
@@ -120,8 +134,6 @@ class SampleTaskSerializer(serializers.ModelSerializer):
 
 
 class TaskSerializer(serializers.ModelSerializer):
-    comments = CommentSerializer(many=True, read_only=True)
-
     class Meta:
         model = Task
         fields = [
@@ -133,6 +145,59 @@ class TaskSerializer(serializers.ModelSerializer):
             "priority",
             "created_at",
             "updated_at",
-            "comments",
         ]
         read_only_fields = ["id", "owner", "created_at", "updated_at"]
+
+
+class TaskDetailSerializer(TaskSerializer):
+    """
+    A task with its comment count (replies included) and the first page of
+    top-level comments; ``comments_cursor`` continues on the comments
+    endpoint.
+    """
+
+    comment_count = serializers.IntegerField(read_only=True)
+    comments = CommentSerializer(source="comment_page", many=True, read_only=True)
+    comments_cursor = serializers.CharField(read_only=True, allow_null=True)
+
+    class Meta(TaskSerializer.Meta):
+        fields = TaskSerializer.Meta.fields + [
+            "comment_count",
+            "comments",
+            "comments_cursor",
+        ]
+
+
+class TaskBulkOperationSerializer(serializers.Serializer):
+    OPERATION_CHOICES = ["create", "update", "delete"]
+
+    op = serializers.ChoiceField(choices=OPERATION_CHOICES)
+    id = serializers.IntegerField(required=False)
+    data = serializers.DictField(required=False, default=dict)
+
+    def validate(self, attrs):
+        if attrs["op"] != "create" and "id" not in attrs:
+            raise serializers.ValidationError({"id": "This field is required."})
+        return attrs
+
+
+class TaskBulkSerializer(serializers.Serializer):
+    MAX_OPERATIONS = 500
+
+    operations = TaskBulkOperationSerializer(many=True)
+
+    def validate_operations(self, value):
+        if not value:
+            raise serializers.ValidationError("No operations given.")
+        if len(value) > self.MAX_OPERATIONS:
+            raise serializers.ValidationError(
+                f"At most {self.MAX_OPERATIONS} operations are allowed per request."
+            )
+        ids = Counter(op["id"] for op in value if op["op"] != "create")
+        repeated = sorted(pk for pk, count in ids.items() if count > 1)
+        if repeated:
+            raise serializers.ValidationError(
+                f"Each task may appear in only one operation; repeated ids: "
+                f"{', '.join(map(str, repeated))}."
+            )
+        return value
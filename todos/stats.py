@@ -0,0 +1,81 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import Case, Count, When
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.caching import InvalidatedCache
+from .models import Task
+
+HISTOGRAM_DAYS = 30
+
+stats_cache = InvalidatedCache("TASK_STATS_CACHE", "TASK_STATS_CACHE_TIMEOUT")
+
+
+def stats_cache_key(owner_id, today):
+    # Keyed by day too, so the histogram window rolls over on its own
+    return f"todos:task-stats:{owner_id}:{today.isoformat()}"
+
+
+def compute_task_stats(owner_id, today):
+    window_start = today - timedelta(days=HISTOGRAM_DAYS - 1)
+    rows = (
+        Task.objects.filter(owner_id=owner_id)
+        .order_by()
+        .values(
+            "status",
+            "priority",
+            day=Case(
+                When(
+                    created_at__gte=timezone.make_aware(
+                        datetime.combine(window_start, time.min)
+                    ),
+                    then=TruncDate("created_at"),
+                ),
+                default=None,
+            ),
+        )
+        .annotate(count=Count("id"))
+    )
+
+    by_status = {choice: 0 for choice, _ in Task.STATUS_CHOICES}
+    by_priority = {choice: 0 for choice, _ in Task.PRIORITY_CHOICES}
+    per_day = {window_start + timedelta(days=i): 0 for i in range(HISTOGRAM_DAYS)}
+    for row in rows:
+        by_status[row["status"]] = by_status.get(row["status"], 0) + row["count"]
+        by_priority[row["priority"]] = (
+            by_priority.get(row["priority"], 0) + row["count"]
+        )
+        if row["day"] in per_day:
+            per_day[row["day"]] += row["count"]
+
+    return {
+        "total": sum(by_status.values()),
+        "by_status": by_status,
+        "by_priority": by_priority,
+        "created_per_day": [
+            {"date": day.isoformat(), "count": count} for day, count in per_day.items()
+        ],
+    }
+
+
+def get_task_stats(owner_id):
+    today = timezone.localdate()
+    key = stats_cache_key(owner_id, today)
+    stats = stats_cache.get(key)
+    if stats is None:
+        stats = compute_task_stats(owner_id, today)
+        stats_cache.set(key, stats)
+    return stats
+
+
+def invalidate_task_stats(owner_id):
+    stats_cache.delete_on_commit(stats_cache_key(owner_id, timezone.localdate()))
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def task_changed(sender, instance, **kwargs):
+    invalidate_task_stats(instance.owner_id)
@@ -1,3 +1,871 @@
-from django.test import TestCase
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from types import ModuleType
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.test import override_settings
+from django.urls import include, path, reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from todo.asgi import application
+from user.models import User
+from user.tokens import RefreshToken
+from .models import Task, TaskTombstone, Comment, CommentLike
+from .urls import task_urlpatterns
+from .views import TaskChangesView
+
+
+class OwnerTestMixin:
+    """A task owner, and an API client authenticated as them."""
+
+    def setUp(self):
+        super().setUp()
+        self.owner = User.objects.create_user("Task", "Owner", "owner@example.com", "pass")
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+
+class OwnerTestCase(OwnerTestMixin, TestCase):
+    pass
+
+
+class OwnerTransactionTestCase(OwnerTestMixin, TransactionTestCase):
+    pass
+
+
+class TaskDetailQueryCountTests(OwnerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.liker = User.objects.create_user("Task", "Liker", "liker@example.com", "pass")
+        self.task = Task.objects.create(owner=self.owner, title="Task")
+
+    def add_thread(self):
+        comment = Comment.objects.create(
+            task=self.task, created_by=self.owner, content="comment"
+        )
+        reply = Comment.objects.create(
+            task=self.task, created_by=self.liker, parent=comment, content="reply"
+        )
+        Comment.objects.create(
+            task=self.task, created_by=self.owner, parent=reply, content="nested"
+        )
+        CommentLike.objects.create(comment=comment, created_by=self.liker)
+        CommentLike.objects.create(
+            comment=reply, created_by=self.owner, reaction_type="love"
+        )
+
+    def get_detail(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("task-detail", args=[self.task.pk]))
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_query_count_does_not_grow_with_comments(self):
+        self.add_thread()
+        _, baseline = self.get_detail()
+
+        for _ in range(20):
+            self.add_thread()
+        response, queries = self.get_detail()
+
+        self.assertEqual(queries, baseline)
+        self.assertEqual(response.data["data"]["comment_count"], 63)
+        self.assertEqual(len(response.data["data"]["comments"]), 20)
+        self.assertIsNotNone(response.data["data"]["comments_cursor"])
+
+    def test_replies_are_previewed_one_level_deep(self):
+        self.add_thread()
+        response, _ = self.get_detail()
+
+        (comment,) = response.data["data"]["comments"]
+        self.assertEqual(comment["like_count"], 1)
+        self.assertEqual(comment["likes"][0]["id"], self.liker.id)
+        self.assertEqual(comment["reply_count"], 1)
+        self.assertIsNone(comment["replies_cursor"])
+        reply = comment["replies"][0]
+        self.assertEqual(reply["likes"][0]["reaction_type"], "love")
+        self.assertEqual(reply["reply_count"], 1)
+        self.assertEqual(reply["replies"], [])
+
+
+class CommentThreadTests(OwnerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create_user("Other", "User", "other@example.com", "pass")
+        self.task = Task.objects.create(owner=self.owner, title="Task")
+        self.comments = [
+            Comment.objects.create(
+                task=self.task, created_by=self.owner, content=f"comment {i}"
+            )
+            for i in range(5)
+        ]
+        self.replies = [
+            Comment.objects.create(
+                task=self.task,
+                created_by=self.other,
+                parent=self.comments[0],
+                content=f"reply {i}",
+            )
+            for i in range(7)
+        ]
+
+    def contents(self, comments):
+        return [comment["content"] for comment in comments]
+
+    def test_comments_are_cursor_paginated_newest_first(self):
+        url = reverse("task-comments", args=[self.task.pk])
+        response = self.client.get(url, {"per_page": 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.contents(response.data["data"]), ["comment 4", "comment 3", "comment 2"]
+        )
+
+        cursor = response.data["pagination"]["next_cursor"]
+        response = self.client.get(url, {"per_page": 3, "cursor": cursor})
+        self.assertEqual(self.contents(response.data["data"]), ["comment 1", "comment 0"])
+        self.assertIsNone(response.data["pagination"]["next_cursor"])
+
+        first = response.data["data"][-1]
+        self.assertEqual(first["reply_count"], 7)
+        self.assertEqual(
+            self.contents(first["replies"]), ["reply 0", "reply 1", "reply 2"]
+        )
+
+    def test_preview_size_is_configurable(self):
+        url = reverse("task-comments", args=[self.task.pk])
+        response = self.client.get(url, {"replies": 5})
+        self.assertEqual(len(response.data["data"][-1]["replies"]), 5)
+
+        response = self.client.get(url, {"replies": 0})
+        self.assertEqual(response.data["data"][-1]["replies"], [])
+        self.assertEqual(response.data["data"][-1]["reply_count"], 7)
+
+        detail_url = reverse("task-detail", args=[self.task.pk])
+        with override_settings(COMMENT_REPLY_PREVIEW=1):
+            response = self.client.get(detail_url)
+        self.assertEqual(len(response.data["data"]["comments"][-1]["replies"]), 1)
+
+        more = self.client.get(
+            detail_url, {"replies": 5}, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(more.status_code, 200)
+        self.assertEqual(len(more.data["data"]["comments"][-1]["replies"]), 5)
+
+    def test_load_more_replies_continues_after_preview(self):
+        response = self.client.get(reverse("task-comments", args=[self.task.pk]))
+        cursor = response.data["data"][-1]["replies_cursor"]
+
+        url = reverse("comment-replies", args=[self.comments[0].pk])
+        response = self.client.get(url, {"cursor": cursor, "per_page": 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.contents(response.data["data"]), ["reply 3", "reply 4", "reply 5"]
+        )
+
+        cursor = response.data["pagination"]["next_cursor"]
+        response = self.client.get(url, {"cursor": cursor, "per_page": 3})
+        self.assertEqual(self.contents(response.data["data"]), ["reply 6"])
+        self.assertIsNone(response.data["pagination"]["next_cursor"])
+
+    def test_comment_pages_are_owner_only(self):
+        self.client.force_authenticate(self.other)
+        response = self.client.get(reverse("task-comments", args=[self.task.pk]))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(
+            reverse("comment-replies", args=[self.comments[0].pk])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_comment_page_query_count_does_not_grow_with_replies(self):
+        url = reverse("task-comments", args=[self.task.pk])
+        with CaptureQueriesContext(connection) as baseline:
+            self.client.get(url)
+
+        for comment in self.comments:
+            for i in range(5):
+                reply = Comment.objects.create(
+                    task=self.task, created_by=self.other, parent=comment
+                )
+                CommentLike.objects.create(comment=reply, created_by=self.owner)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+
+        self.assertEqual(len(queries), len(baseline))
+        self.assertEqual(response.data["data"][0]["reply_count"], 5)
+
+
+class TaskListCursorPaginationTests(OwnerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tasks = [
+            Task.objects.create(owner=self.owner, title=f"Task {i}") for i in range(7)
+        ]
+        # Share a timestamp between some rows so ties are broken by id
+        Task.objects.filter(pk__in=[t.pk for t in self.tasks[2:5]]).update(
+            created_at=self.tasks[2].created_at
+        )
+
+    def get_page(self, **params):
+        response = self.client.get(
+            reverse("task-list-create"), {"pagination": "cursor", "per_page": 3, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        return [task["id"] for task in response.data["data"]], response.data["pagination"]
+
+    def test_walks_forward_and_back(self):
+        expected = list(
+            Task.objects.order_by("-created_at", "-id").values_list("id", flat=True)
+        )
+
+        first, meta = self.get_page()
+        self.assertEqual(first, expected[:3])
+        self.assertIsNone(meta["previous_cursor"])
+        self.assertNotIn("total_count", meta)
+
+        second, meta = self.get_page(cursor=meta["next_cursor"])
+        self.assertEqual(second, expected[3:6])
+
+        third, meta = self.get_page(cursor=meta["next_cursor"])
+        self.assertEqual(third, expected[6:])
+        self.assertIsNone(meta["next_cursor"])
+
+        back, meta = self.get_page(cursor=meta["previous_cursor"])
+        self.assertEqual(back, expected[3:6])
+
+        back, meta = self.get_page(cursor=meta["previous_cursor"])
+        self.assertEqual(back, expected[:3])
+        self.assertIsNone(meta["previous_cursor"])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse("task-list-create"), {"cursor": "bogus"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_number_pagination_is_default(self):
+        response = self.client.get(reverse("task-list-create"))
+        self.assertEqual(response.data["pagination"]["total_count"], 7)
+
+
+class TaskDateFilterTests(OwnerTestCase):
+    def create(self, title, created_at):
+        task = Task.objects.create(owner=self.owner, title=title)
+        Task.objects.filter(pk=task.pk).update(
+            created_at=datetime.fromisoformat(created_at).replace(tzinfo=dt_timezone.utc)
+        )
+
+    def test_end_date_includes_the_whole_day(self):
+        self.create("Before", "2024-07-31T23:59:59.999999")
+        self.create("First", "2024-08-01T00:00:00")
+        self.create("Last", "2024-08-31T23:59:59.999999")
+        self.create("After", "2024-09-01T00:00:00")
+
+        response = self.client.get(
+            reverse("task-list-create"),
+            {"start_date": "2024-08-01", "end_date": "2024-08-31"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(task["title"] for task in response.data["data"]), ["First", "Last"]
+        )
+
+
+class TaskSearchTests(OwnerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create_user("Task", "Other", "other@example.com", "pass")
+
+    def search(self, query, **params):
+        response = self.client.get(reverse("task-list-create"), {"search": query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [task["title"] for task in response.data["data"]]
+
+    def test_prefix_match_scoped_to_owner(self):
+        Task.objects.create(owner=self.owner, title="Groceries", description="buy milk")
+        Task.objects.create(owner=self.owner, title="Laundry")
+        Task.objects.create(owner=self.other, title="Grocery run")
+
+        self.assertEqual(self.search("groc"), ["Groceries"])
+        self.assertEqual(self.search("groceries milk"), ["Groceries"])
+        self.assertEqual(self.search("groceries bread"), [])
+        self.assertEqual(self.search("groc", pagination="cursor"), ["Groceries"])
+
+    def test_ranked_by_relevance(self):
+        Task.objects.create(owner=self.owner, title="Report", description="write report report report")
+        Task.objects.create(owner=self.owner, title="Email", description="mention report once in a long description")
+
+        self.assertEqual(self.search("report"), ["Report", "Email"])
+
+    def test_index_follows_updates_and_deletes(self):
+        task = Task.objects.create(owner=self.owner, title="Draft")
+        task.title = "Published"
+        task.save()
+        self.assertEqual(self.search("draft"), [])
+        self.assertEqual(self.search("publ"), ["Published"])
+
+        task.delete()
+        self.assertEqual(self.search("publ"), [])
+
+    def test_falls_back_to_substring_match(self):
+        Task.objects.create(owner=self.owner, title="100% done")
+
+        self.assertEqual(self.search("%"), ["100% done"])
+        with self.settings(TASK_SEARCH_BACKEND="todos.search.IContainsTaskSearch"):
+            self.assertEqual(self.search("0% do"), ["100% done"])
+
+
+class CommentReactionCountTests(OwnerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.task = Task.objects.create(owner=self.owner, title="Task")
+        self.comment = Comment.objects.create(task=self.task, created_by=self.owner)
+
+    def react(self, reaction_type):
+        return self.client.post(
+            reverse("like-comment", args=[self.comment.pk]),
+            {"reaction_type": reaction_type},
+        )
+
+    def counts(self):
+        self.comment.refresh_from_db()
+        return {k: v for k, v in self.comment.reaction_counts.items() if v}
+
+    def test_counters_follow_reactions(self):
+        response = self.react("like")
+        self.assertEqual(response.data["data"]["like_count"], 1)
+        self.assertEqual(self.counts(), {"like": 1})
+
+        response = self.react("love")
+        self.assertEqual(response.data["data"]["reaction_counts"]["love"], 1)
+        self.assertEqual(self.counts(), {"love": 1})
+
+        response = self.react("love")
+        self.assertEqual(response.data["data"]["like_count"], 0)
+        self.assertEqual(self.counts(), {})
+
+    def test_counters_follow_cascading_deletes(self):
+        other = User.objects.create_user("Other", "User", "other@example.com", "pass")
+        CommentLike.objects.create(comment=self.comment, created_by=other, reaction_type="wow")
+        CommentLike.objects.create(comment=self.comment, created_by=self.owner)
+        self.assertEqual(self.counts(), {"wow": 1, "like": 1})
+
+        other.delete()
+        self.assertEqual(self.counts(), {"like": 1})
+
+    def test_rebuild_command(self):
+        CommentLike.objects.create(comment=self.comment, created_by=self.owner, reaction_type="sad")
+        Comment.objects.filter(pk=self.comment.pk).update(sad_reactions=0, like_reactions=5)
+
+        call_command("rebuild_reaction_counts", stdout=StringIO())
+        self.assertEqual(self.counts(), {"sad": 1})
+
+    def test_reacting_to_a_deleted_comment_is_not_found(self):
+        Comment.objects.filter(pk=self.comment.pk).delete()
+        self.assertEqual(self.react("like").status_code, 404)
+        self.assertFalse(CommentLike.objects.exists())
+
+
+class CommentReactionToggleConcurrencyTests(OwnerTransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.task = Task.objects.create(owner=self.owner, title="Task")
+        self.comment = Comment.objects.create(task=self.task, created_by=self.owner)
+
+    def toggle_in_parallel(self, users, reaction_type, times=1):
+        def toggle(user):
+            try:
+                client = APIClient()
+                client.force_authenticate(user)
+                return client.post(
+                    reverse("like-comment", args=[self.comment.pk]),
+                    {"reaction_type": reaction_type},
+                ).status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            return list(pool.map(toggle, users * times))
+
+    def test_parallel_toggles_by_one_user(self):
+        statuses = self.toggle_in_parallel([self.owner], "love", times=6)
+
+        self.assertEqual(statuses, [200] * 6)
+        # An even number of toggles always ends with no reaction
+        self.assertFalse(CommentLike.objects.exists())
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.reaction_total, 0)
+
+    def test_parallel_reactions_by_many_users(self):
+        users = [
+            User.objects.create_user("User", str(i), f"user{i}@example.com", "pass")
+            for i in range(8)
+        ]
+        statuses = self.toggle_in_parallel(users, "like")
+
+        self.assertEqual(statuses, [200] * 8)
+        self.assertEqual(CommentLike.objects.count(), 8)
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.like_reactions, 8)
+
+
+class TaskBulkTests(OwnerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create_user("Task", "Other", "other@example.com", "pass")
+
+    def bulk(self, operations):
+        return self.client.post(
+            reverse("task-bulk"), {"operations": operations}, format="json"
+        )
+
+    def test_applies_operations_in_one_request(self):
+        to_update = Task.objects.create(owner=self.owner, title="Old")
+        to_delete = Task.objects.create(owner=self.owner, title="Gone")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.bulk(
+                [{"op": "create", "data": {"title": f"New {i}"}} for i in range(50)]
+                + [
+                    {"op": "update", "id": to_update.pk, "data": {"status": "done"}},
+                    {"op": "delete", "id": to_delete.pk},
+                ]
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(len(queries), 15)
+        results = response.data["data"]["results"]
+        self.assertEqual([r["status"] for r in results[-3:]], ["created", "updated", "deleted"])
+        self.assertEqual(results[0]["data"]["title"], "New 0")
+        self.assertEqual(Task.objects.filter(owner=self.owner).count(), 51)
+        to_update.refresh_from_db()
+        self.assertEqual(to_update.status, "done")
+        self.assertGreater(to_update.updated_at, to_update.created_at)
+
+    def test_invalid_operation_saves_nothing(self):
+        others = Task.objects.create(owner=self.other, title="Not mine")
+
+        response = self.bulk(
+            [
+                {"op": "create", "data": {"title": "Fine"}},
+                {"op": "create", "data": {"title": "Bad", "status": "nope"}},
+                {"op": "delete", "id": others.pk},
+            ]
+        )
+
+        self.assertEqual(response.status_code, 400)
+        results = response.data["data"]["results"]
+        self.assertNotIn("errors", results[0])
+        self.assertEqual(results[1]["status"], "invalid")
+        self.assertIn("status", results[1]["errors"])
+        self.assertEqual(results[2]["status"], "not_found")
+        self.assertFalse(Task.objects.filter(owner=self.owner).exists())
+        self.assertTrue(Task.objects.filter(pk=others.pk).exists())
+
+    def test_rejects_repeated_ids(self):
+        task = Task.objects.create(owner=self.owner, title="Task")
+
+        for operations in (
+            [{"op": "update", "id": task.pk, "data": {"status": "done"}},
+             {"op": "delete", "id": task.pk}],
+            [{"op": "delete", "id": task.pk}, {"op": "delete", "id": task.pk}],
+        ):
+            response = self.bulk(operations)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(
+                response.data["message"],
+                f"Each task may appear in only one operation; repeated ids: {task.pk}.",
+            )
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, "todo")
+
+
+class TaskChangesTests(OwnerTestCase):
+    def changes(self, **params):
+        response = self.client.get(reverse("task-changes"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data["data"]
+
+    def test_returns_changes_and_tombstones_since_watermark(self):
+        kept = Task.objects.create(owner=self.owner, title="Kept")
+        removed = Task.objects.create(owner=self.owner, title="Removed")
+
+        full = self.changes()
+        self.assertEqual({t["id"] for t in full["changed"]}, {kept.pk, removed.pk})
+        self.assertEqual(full["deleted"], [])
+
+        self.assertEqual(self.changes(**full["next"])["changed"], [])
+
+        kept.title = "Kept and edited"
+        kept.save()
+        response = self.client.delete(reverse("task-detail", args=[removed.pk]))
+        self.assertEqual(response.status_code, 204)
+
+        delta = self.changes(**full["next"])
+        self.assertEqual([t["title"] for t in delta["changed"]], ["Kept and edited"])
+        self.assertEqual(delta["deleted"], [removed.pk])
+
+    def test_pages_through_rows_sharing_a_timestamp(self):
+        tasks = [Task.objects.create(owner=self.owner, title=str(i)) for i in range(5)]
+        Task.objects.filter(owner=self.owner).update(updated_at=tasks[0].updated_at)
+
+        seen, params = [], {}
+        with mock.patch.object(TaskChangesView, "page_size", 2):
+            while True:
+                data = self.changes(**params)
+                seen += [t["id"] for t in data["changed"]]
+                params = data["next"]
+                if not data["has_more"]:
+                    break
+        self.assertEqual(seen, [t.pk for t in tasks])
+
+    def test_pages_tombstones_from_the_last_one_served(self):
+        tasks = [Task.objects.create(owner=self.owner, title=str(i)) for i in range(5)]
+        params = self.changes()["next"]
+        ids = [task.pk for task in tasks]
+        for task in tasks:
+            task.delete()
+
+        deleted = []
+        with mock.patch.object(TaskChangesView, "page_size", 2):
+            while True:
+                data = self.changes(**params)
+                deleted += data["deleted"]
+                params = data["next"]
+                if not data["has_more"]:
+                    break
+        self.assertEqual(deleted, ids)
+        self.assertEqual(self.changes(**params)["deleted"], [])
+
+    def test_expired_sync_state_forces_a_full_sync(self):
+        Task.objects.create(owner=self.owner, title="Task")
+        params = self.changes()["next"]
+        params["synced_at"] = (timezone.now() - timedelta(days=31)).isoformat()
+
+        response = self.client.get(reverse("task-changes"), params)
+        self.assertEqual(response.status_code, 410)
+
+        # Clients from before synced_at existed resync too
+        del params["synced_at"]
+        response = self.client.get(reverse("task-changes"), params)
+        self.assertEqual(response.status_code, 410)
+
+    def test_out_of_range_datetimes_are_rejected(self):
+        Task.objects.create(owner=self.owner, title="Task")
+        params = self.changes()["next"]
+        for field in ("since", "synced_at"):
+            response = self.client.get(
+                reverse("task-changes"), {**params, field: "2024-13-01T00:00:00"}
+            )
+            self.assertEqual(response.status_code, 400)
+
+    def test_prune_tombstones(self):
+        old, recent = (
+            Task.objects.create(owner=self.owner, title="Task").pk for _ in range(2)
+        )
+        Task.objects.filter(pk__in=[old, recent]).delete()
+        TaskTombstone.objects.filter(task_id=old).update(
+            deleted_at=timezone.now() - timedelta(days=31)
+        )
+
+        call_command("prune_tombstones", stdout=StringIO())
+        self.assertEqual(
+            list(TaskTombstone.objects.values_list("task_id", flat=True)), [recent]
+        )
+
+    def test_owner_deletion_leaves_no_tombstones(self):
+        Task.objects.create(owner=self.owner, title="Task")
+        self.owner.delete()
+        self.assertFalse(TaskTombstone.objects.exists())
+
+
+class TaskConditionalGetTests(OwnerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.task = Task.objects.create(owner=self.owner, title="Task")
+
+    def assertRevalidates(self, url, change, queries=1):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(len(captured), queries)
+
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_detail_etag_tracks_task(self):
+        def change():
+            self.task.status = "done"
+            self.task.save()
+
+        self.assertRevalidates(reverse("task-detail", args=[self.task.pk]), change)
+
+    def test_detail_etag_tracks_reactions(self):
+        comment = Comment.objects.create(task=self.task, created_by=self.owner)
+
+        def change():
+            CommentLike.objects.toggle(comment.pk, self.owner, "like")
+
+        self.assertRevalidates(reverse("task-detail", args=[self.task.pk]), change)
+
+    def test_list_etag_tracks_deletes(self):
+        Task.objects.create(owner=self.owner, title="Other")
+
+        # Page-number pages count the set, as they show the total anyway
+        self.assertRevalidates(reverse("task-list-create"), self.task.delete, queries=2)
+
+    def test_list_etag_with_search(self):
+        def change():
+            Task.objects.create(owner=self.owner, title="Task two")
+
+        self.assertRevalidates(
+            reverse("task-list-create") + "?search=task", change, queries=2
+        )
+
+    def test_cursor_list_revalidates_with_the_page_query_only(self):
+        def change():
+            self.task.title = "Renamed"
+            self.task.save()
+
+        self.assertRevalidates(reverse("task-list-create") + "?pagination=cursor", change)
+
+    def test_detail_etag_tracks_author_profiles(self):
+        Comment.objects.create(task=self.task, created_by=self.owner)
+
+        def change():
+            self.owner.first_name = "Renamed"
+            self.owner.save()
+
+        self.assertRevalidates(reverse("task-detail", args=[self.task.pk]), change)
+
+    def test_saves_not_touching_the_name_leave_profiles_alone(self):
+        self.owner.set_password("new-pass")
+        with self.assertNumQueries(1):
+            self.owner.save(update_fields=["password"])
+
+        with self.assertNumQueries(2):
+            self.owner.save(update_fields=["username"])
+
+    def test_if_modified_since(self):
+        url = reverse("task-detail", args=[self.task.pk])
+        last_modified = self.client.get(url)["Last-Modified"]
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+
+class TaskStatsTests(OwnerTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def stats(self):
+        response = self.client.get(reverse("task-stats"))
+        self.assertEqual(response.status_code, 200)
+        return response.data["data"]
+
+    def test_counts_and_histogram(self):
+        Task.objects.create(owner=self.owner, title="A", status="done", priority="high")
+        Task.objects.create(owner=self.owner, title="B")
+        old = Task.objects.create(owner=self.owner, title="C")
+        Task.objects.filter(pk=old.pk).update(
+            created_at=timezone.now() - timedelta(days=90)
+        )
+
+        with self.assertNumQueries(1):
+            stats = self.stats()
+
+        self.assertEqual(stats["total"], 3)
+        self.assertEqual(stats["by_status"], {"todo": 2, "in_progress": 0, "done": 1})
+        self.assertEqual(stats["by_priority"]["medium"], 2)
+        self.assertEqual(len(stats["created_per_day"]), 30)
+        self.assertEqual(stats["created_per_day"][-1]["count"], 2)
+
+    def test_cached_until_tasks_change(self):
+        task = Task.objects.create(owner=self.owner, title="A")
+        self.stats()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.stats()["by_status"]["todo"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task.status = "done"
+            task.save()
+        self.assertEqual(self.stats()["by_status"], {"todo": 0, "in_progress": 0, "done": 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("task-bulk"),
+                {"operations": [{"op": "create", "data": {"title": "B"}}]},
+                format="json",
+            )
+        self.assertEqual(self.stats()["total"], 2)
+
+
+class TaskEventsSocketTests(OwnerTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.other = User.objects.create_user("Other", "User", "other@example.com", "pass")
+        User.objects.update(is_active=True)
+        self.owner.refresh_from_db()
+        self.other.refresh_from_db()
+        self.task = Task.objects.create(owner=self.owner, title="Task")
+        self.tokens = {
+            user: RefreshToken.for_user(user).access_token
+            for user in (self.owner, self.other)
+        }
+
+    async def connect(self, user):
+        token = self.tokens[user]
+        communicator = ApplicationCommunicator(
+            application,
+            {
+                "type": "websocket",
+                "path": f"/ws/tasks/{self.task.pk}/",
+                "query_string": f"token={token}".encode(),
+                "headers": [],
+            },
+        )
+        await communicator.send_input({"type": "websocket.connect"})
+        return communicator, await communicator.receive_output(2)
+
+    def call(self, method, url, data=None):
+        # Run in the test's thread and connection, committing on exit
+        def request():
+            with self.captureOnCommitCallbacks(execute=True):
+                return getattr(self.client, method)(url, data, format="json")
+
+        return sync_to_async(request)()
+
+    async def next_event(self, communicator):
+        return json.loads((await communicator.receive_output(2))["text"])
+
+    async def test_comment_and_reaction_events_are_pushed(self):
+        communicator, message = await self.connect(self.owner)
+        self.assertEqual(message["type"], "websocket.accept")
+
+        response = await self.call(
+            "post", reverse("add-comment", args=[self.task.pk]), {"content": "hi"}
+        )
+        comment_id = response.data["data"]["id"]
+        event = await self.next_event(communicator)
+        self.assertEqual(event["type"], "comment-added")
+        self.assertEqual(event["data"]["content"], "hi")
+
+        await self.call(
+            "post", reverse("like-comment", args=[comment_id]), {"reaction_type": "love"}
+        )
+        event = await self.next_event(communicator)
+        self.assertEqual(event["type"], "reaction-changed")
+        self.assertEqual(event["data"]["reaction_counts"]["love"], 1)
+
+        await self.call(
+            "put", reverse("update-comment", args=[comment_id]), {"content": "edited"}
+        )
+        self.assertEqual((await self.next_event(communicator))["type"], "comment-updated")
+
+        await self.call("delete", reverse("delete-comment", args=[comment_id]))
+        event = await self.next_event(communicator)
+        self.assertEqual((event["type"], event["data"]), ("comment-deleted", {"id": comment_id}))
+
+        await communicator.send_input({"type": "websocket.disconnect", "code": 1000})
+        await communicator.wait(2)
+
+    async def test_only_the_owner_can_subscribe(self):
+        _, message = await self.connect(self.other)
+        self.assertEqual(message, {"type": "websocket.close", "code": 4404})
+
+        communicator = ApplicationCommunicator(
+            application,
+            {"type": "websocket", "path": f"/ws/tasks/{self.task.pk}/", "headers": []},
+        )
+        await communicator.send_input({"type": "websocket.connect"})
+        self.assertEqual((await communicator.receive_output(2))["code"], 4401)
+
+
+both_read_modes = ModuleType("both_read_modes")
+both_read_modes.urlpatterns = [
+    path("sync/", include(task_urlpatterns())),
+    path("async/", include(task_urlpatterns(["task-list-create", "task-detail"]))),
+]
+
+
+@override_settings(ROOT_URLCONF=both_read_modes)
+class AsyncTaskReadTests(OwnerTestCase):
+    def setUp(self):
+        super().setUp()
+        User.objects.update(is_active=True)
+        self.owner.refresh_from_db()
+        self.tasks = [
+            Task.objects.create(owner=self.owner, title=f"Task {i}", priority="high")
+            for i in range(3)
+        ]
+        comment = Comment.objects.create(
+            task=self.tasks[0], created_by=self.owner, content="comment"
+        )
+        Comment.objects.create(
+            task=self.tasks[0], created_by=self.owner, parent=comment, content="reply"
+        )
+        CommentLike.objects.toggle(comment.pk, self.owner, "love")
+        # Bearer tokens only, so both views authenticate the same way
+        self.client.force_authenticate(None)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.owner).access_token}"
+        )
+
+    def get_both(self, path, **params):
+        return [self.client.get(f"/{mode}/{path}", params) for mode in ("sync", "async")]
+
+    def test_async_reads_match_sync_reads(self):
+        for path, params in [
+            ("", {}),
+            ("", {"priority": "high", "per_page": 2, "page": 2}),
+            ("", {"pagination": "cursor", "per_page": 2}),
+            (f"{self.tasks[0].pk}/", {}),
+        ]:
+            sync_response, async_response = self.get_both(path, **params)
+            self.assertEqual(async_response.status_code, 200)
+            self.assertEqual(async_response.json(), sync_response.json())
+            self.assertIn("ETag", async_response)
+
+    def test_async_conditional_get_and_errors(self):
+        response = self.client.get("/async/")
+        not_modified = self.client.get("/async/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+
+        sync_response, async_response = self.get_both("999999/")
+        self.assertEqual(async_response.status_code, 404)
+        self.assertEqual(async_response.json(), sync_response.json())
+
+        self.client.credentials()
+        sync_response, async_response = self.get_both("")
+        self.assertEqual(async_response.status_code, 401)
+        self.assertEqual(async_response.json(), sync_response.json())
+        self.assertEqual(async_response["WWW-Authenticate"], sync_response["WWW-Authenticate"])
+
+    def test_writes_go_to_the_sync_view(self):
+        response = self.client.post("/async/", {"title": "New"}, format="json")
+        self.assertEqual(response.status_code, 201)
+
+        response = self.client.put(
+            f"/async/{self.tasks[1].pk}/", {"title": "Renamed"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.delete(f"/async/{self.tasks[2].pk}/")
+        self.assertEqual(response.status_code, 204)
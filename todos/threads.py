@@ -0,0 +1,78 @@
+from collections import defaultdict
+
+from django.conf import settings
+from rest_framework.pagination import _positive_int
+
+from core.pagination import CustomCursorPagination
+
+from .models import Comment
+
+REPLY_PREVIEW_QUERY_PARAM = "replies"
+MAX_REPLY_PREVIEW = 20
+
+
+class CommentCursorPagination(CustomCursorPagination):
+    """A task's top-level comments, newest first."""
+
+    page_size = 20
+
+
+class ReplyCursorPagination(CustomCursorPagination):
+    """A comment's replies, oldest first, the order they're previewed in."""
+
+    page_size = 20
+    descending = False
+
+
+def reply_preview_size(request=None):
+    """Replies shown per comment: ``?replies=`` or COMMENT_REPLY_PREVIEW."""
+    default = getattr(settings, "COMMENT_REPLY_PREVIEW", 3)
+    if request is None:
+        return default
+    try:
+        return _positive_int(
+            request.query_params[REPLY_PREVIEW_QUERY_PARAM], cutoff=MAX_REPLY_PREVIEW
+        )
+    except (KeyError, ValueError):
+        return default
+
+
+def thread_queryset():
+    return Comment.objects.with_related().with_reply_count()
+
+
+def preview_queryset(comments, size):
+    if not comments or not size:
+        return Comment.objects.none()
+    return thread_queryset().reply_previews([c.pk for c in comments], size)
+
+
+def attach_reply_previews(comments, previews):
+    """
+    Set ``preview_replies`` on each of ``comments`` from ``previews`` (see
+    ``preview_queryset``), plus ``replies_cursor``, the replies endpoint
+    cursor for the rest when only part of them is previewed.
+    """
+    grouped = defaultdict(list)
+    for reply in previews:
+        grouped[reply.parent_id].append(reply)
+
+    pagination = ReplyCursorPagination()
+    for comment in comments:
+        comment.preview_replies = grouped[comment.pk]
+        comment.replies_cursor = None
+        if comment.preview_replies and comment.reply_count > len(
+            comment.preview_replies
+        ):
+            comment.replies_cursor = pagination.encode_cursor(
+                comment.preview_replies[-1], reverse=False
+            )
+    return comments
+
+
+def task_comments(task_id):
+    return thread_queryset().filter(task_id=task_id, parent=None)
+
+
+def comment_replies(comment_id):
+    return thread_queryset().filter(parent_id=comment_id)
@@ -1,25 +1,59 @@
+from django.conf import settings
 from django.urls import path
-from .views import TaskListCreateView, TaskDetailView,AddCommentView,UpdateCommentView,DeleteCommentView,CommentLikeAPIView
+from .views import TaskListCreateView, TaskDetailView,TaskBulkView,TaskChangesView,TaskStatsView,AddCommentView,TaskCommentsView,CommentRepliesView,UpdateCommentView,DeleteCommentView,CommentLikeAPIView
+from .async_views import AsyncTaskDetailView, AsyncTaskListView
 
-urlpatterns = [
-    path("", TaskListCreateView.as_view(), name="task-list-create"),
-    path("<int:pk>/", TaskDetailView.as_view(), name="task-detail"),
-    path(
-        "<int:pk>/comment/", AddCommentView.as_view(), name="add-comment"
-    ),  # for adding a comment to a specific post
-    path(
-        "comment/<int:pk>/update/",
-        UpdateCommentView.as_view(),
-        name="update-comment",
-    ),  # for updating a specific comment
-    path(
-        "comment/<int:pk>/delete/",
-        DeleteCommentView.as_view(),
-        name="delete-comment",
-    ),  # for deleting a specific comment
-    path(
-        "comment/<int:pk>/like/",
-        CommentLikeAPIView.as_view(),
-        name="like-comment",
-    ),  # for liking a specific comment
-]
+
+def task_urlpatterns(async_reads=()):
+    """
+    URL patterns for the app. Routes named in ``async_reads`` serve GET from
+    the async-native views; worth it only when running under ASGI.
+    """
+
+    def read_view(name, sync_view, async_view):
+        return (async_view if name in async_reads else sync_view).as_view()
+
+    return [
+        path(
+            "",
+            read_view("task-list-create", TaskListCreateView, AsyncTaskListView),
+            name="task-list-create",
+        ),
+        path(
+            "<int:pk>/",
+            read_view("task-detail", TaskDetailView, AsyncTaskDetailView),
+            name="task-detail",
+        ),
+        path("bulk/", TaskBulkView.as_view(), name="task-bulk"),
+        path("changes/", TaskChangesView.as_view(), name="task-changes"),
+        path("stats/", TaskStatsView.as_view(), name="task-stats"),
+        path(
+            "<int:pk>/comments/", TaskCommentsView.as_view(), name="task-comments"
+        ),
+        path(
+            "<int:pk>/comment/", AddCommentView.as_view(), name="add-comment"
+        ),  # for adding a comment to a specific post
+        path(
+            "comment/<int:pk>/replies/",
+            CommentRepliesView.as_view(),
+            name="comment-replies",
+        ),
+        path(
+            "comment/<int:pk>/update/",
+            UpdateCommentView.as_view(),
+            name="update-comment",
+        ),  # for updating a specific comment
+        path(
+            "comment/<int:pk>/delete/",
+            DeleteCommentView.as_view(),
+            name="delete-comment",
+        ),  # for deleting a specific comment
+        path(
+            "comment/<int:pk>/like/",
+            CommentLikeAPIView.as_view(),
+            name="like-comment",
+        ),  # for liking a specific comment
+    ]
+
+
+urlpatterns = task_urlpatterns(getattr(settings, "ASYNC_TASK_READS", ()))
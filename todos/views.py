@@ -1,58 +1,155 @@
 from rest_framework.views import APIView
 from rest_framework import status, permissions
 from django.shortcuts import get_object_or_404
-from .models import Task, Comment,CommentLike
-from .serializers import TaskSerializer, CommentSerializer, SampleTaskSerializer
-from core.pagination import CustomPagination
+from .models import Task, TaskTombstone, Comment, CommentLike, tombstone_retention
+from .serializers import (
+    TaskSerializer,
+    TaskDetailSerializer,
+    CommentSerializer,
+    SampleTaskSerializer,
+    TaskBulkSerializer,
+)
+from .search import get_task_search_backend
+from .stats import get_task_stats, invalidate_task_stats
+from .threads import (
+    CommentCursorPagination,
+    ReplyCursorPagination,
+    attach_reply_previews,
+    comment_replies,
+    preview_queryset,
+    reply_preview_size,
+    task_comments,
+    thread_queryset,
+)
+from .realtime import (
+    COMMENT_ADDED,
+    COMMENT_DELETED,
+    COMMENT_UPDATED,
+    REACTION_CHANGED,
+    publish_task_event,
+)
+from core.pagination import CustomPagination, CustomCursorPagination
 from core.responses import CustomResponse
-from django.utils.dateparse import parse_date
-from django.db.models import Q
+from core.conditional import ConditionalGetMixin, make_etag
+from django.utils.dateparse import parse_date, parse_datetime
+from django.db.models import Max, Q
+from django.http import Http404
+from django.utils import timezone
+from django.db import transaction
+from datetime import datetime, time, timedelta
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def filter_tasks(tasks, params):
+    """Apply the task list's query parameters to ``tasks``."""
+    status_filter = params.get("status")
+    priority_filter = params.get("priority")
+    start_date = params.get("start_date")  # e.g. "2024-08-01"
+    end_date = params.get("end_date")  # e.g. "2024-08-31"
+    search_query = params.get("search")  # title/description keyword
+
+    if status_filter:
+        tasks = tasks.filter(status=status_filter)
+
+    if priority_filter:
+        tasks = tasks.filter(priority=priority_filter)
+
+    # Compare created_at against day boundaries rather than using
+    # created_at__date, which casts the column and can't use an index.
+    if start_date:
+        parsed_start = parse_date(start_date)
+        if parsed_start:
+            tasks = tasks.filter(created_at__gte=start_of_day(parsed_start))
+
+    if end_date:
+        parsed_end = parse_date(end_date)
+        if parsed_end:
+            tasks = tasks.filter(
+                created_at__lt=start_of_day(parsed_end + timedelta(days=1))
+            )
 
-class TaskListCreateView(APIView):
+    if search_query:
+        tasks = get_task_search_backend().search(tasks, search_query)
+    return tasks
+
+
+def task_list_etag(request, page, pagination):
+    """
+    ETag for a list page from the rows and pagination being served; every
+    field shown is on the row and saves bump its updated_at.
+    """
+    return make_etag(
+        "tasks",
+        request.user.pk,
+        request.get_full_path(),
+        [(task.pk, task.updated_at) for task in page],
+        pagination,
+    )
+
+
+def task_detail_validators(request, pk, state):
+    """ETag and Last-Modified for a task from its ``with_comment_state`` row."""
+    etag = make_etag(
+        "task", pk, request.get_host(), reply_preview_size(request), *state.values()
+    )
+    last_modified = max(
+        value for key, value in state.items() if key.endswith("_at") and value
+    )
+    return etag, last_modified
+
+
+TASK_STATE_FIELDS = (
+    "updated_at",
+    "comment_count",
+    "comments_updated_at",
+    "reaction_count",
+    "reactions_updated_at",
+    "authors_updated_at",
+    "likers_updated_at",
+)
+
+
+class TaskListCreateView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = CustomPagination
+    cursor_pagination_class = CustomCursorPagination
+
+    def get_paginator(self, request):
+        # Clients opt into keyset pagination with ?pagination=cursor (or by
+        # sending a cursor); page-number pagination stays the default.
+        if (
+            request.query_params.get("pagination") == "cursor"
+            or self.cursor_pagination_class.cursor_query_param in request.query_params
+        ):
+            return self.cursor_pagination_class()
+        return self.pagination_class()
 
     def get(self, request):
-        status_filter = request.query_params.get("status")
-        priority_filter = request.query_params.get("priority")
-        start_date = request.query_params.get("start_date")  # e.g. "2024-08-01"
-        end_date = request.query_params.get("end_date")  # e.g. "2024-08-31"
-        search_query = request.query_params.get("search")  # title/description keyword
-
-        tasks = Task.objects.filter(owner=request.user)
-
-        if status_filter:
-            tasks = tasks.filter(status=status_filter)
-
-        if priority_filter:
-            tasks = tasks.filter(priority=priority_filter)
-
-        if start_date:
-            parsed_start = parse_date(start_date)
-            if parsed_start:
-                tasks = tasks.filter(created_at__date__gte=parsed_start)
-
-        if end_date:
-            parsed_end = parse_date(end_date)
-            if parsed_end:
-                tasks = tasks.filter(created_at__date__lte=parsed_end)
-
-        if search_query:
-            tasks = tasks.filter(
-                Q(title__icontains=search_query)
-                | Q(description__icontains=search_query)
-            )
+        tasks = filter_tasks(
+            Task.objects.filter(owner=request.user), request.query_params
+        )
 
-        paginator = self.pagination_class()
+        # Validate against the page itself: the indexed page query is all a
+        # revalidation costs, rather than a scan of the whole filtered set
+        paginator = self.get_paginator(request)
         paginated_tasks = paginator.paginate_queryset(tasks, request)
+        pagination_meta = paginator.get_pagination_meta()
+        etag = task_list_etag(request, paginated_tasks, pagination_meta)
+        not_modified = self.not_modified(request, etag)
+        if not_modified:
+            return not_modified
+
         serializer = SampleTaskSerializer(
             paginated_tasks, many=True, context={"request": request}
         )
-        pagination_meta = paginator.get_pagination_meta()
 
-        return CustomResponse(
+        response = CustomResponse(
             data=serializer.data, status=status.HTTP_200_OK, pagination=pagination_meta
         )
+        return self.set_validators(response, etag)
 
     def post(self, request):
         serializer = TaskSerializer(data=request.data)
@@ -68,16 +165,40 @@ class TaskListCreateView(APIView):
         )
 
 
-class TaskDetailView(APIView):
+class TaskDetailView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self, pk, user):
         return get_object_or_404(Task, pk=pk, owner=user)
 
     def get(self, request, pk):
+        state = (
+            Task.objects.filter(pk=pk, owner=request.user)
+            .with_comment_state()
+            .values(*TASK_STATE_FIELDS)
+            .first()
+        )
+        if state is None:
+            raise Http404("No Task matches the given query.")
+
+        etag, last_modified = task_detail_validators(request, pk, state)
+        not_modified = self.not_modified(request, etag, last_modified)
+        if not_modified:
+            return not_modified
+
+        # Only the first page of the thread; the rest is on TaskCommentsView
         task = self.get_object(pk, request.user)
-        serializer = TaskSerializer(task, context={"request": request})
-        return CustomResponse(data=serializer.data, status=status.HTTP_200_OK)
+        paginator = CommentCursorPagination()
+        task.comment_count = state["comment_count"] or 0
+        task.comment_page = paginator.first_page(task_comments(task.pk))
+        attach_reply_previews(
+            task.comment_page,
+            preview_queryset(task.comment_page, reply_preview_size(request)),
+        )
+        task.comments_cursor = paginator.get_next_cursor()
+        serializer = TaskDetailSerializer(task, context={"request": request})
+        response = CustomResponse(data=serializer.data, status=status.HTTP_200_OK)
+        return self.set_validators(response, etag, last_modified)
 
     def put(self, request, pk):
         task = self.get_object(pk, request.user)
@@ -103,6 +224,264 @@ class TaskDetailView(APIView):
         )
 
 
+class TaskBulkView(APIView):
+    """
+    Apply many create/update/delete operations in one request:
+
+        {"operations": [
+            {"op": "create", "data": {"title": "..."}},
+            {"op": "update", "id": 12, "data": {"status": "done"}},
+            {"op": "delete", "id": 13}
+        ]}
+
+    Everything is validated first; if any operation is invalid nothing is
+    written. Otherwise all writes happen in one transaction with bulk queries.
+    Results are reported per operation, in request order. A task may appear
+    in only one update or delete.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    update_fields = ["title", "description", "status", "priority", "updated_at"]
+
+    def post(self, request):
+        serializer = TaskBulkSerializer(data=request.data)
+        if not serializer.is_valid():
+            return CustomResponse(
+                data=serializer.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+        operations = serializer.validated_data["operations"]
+        results = [{"index": i, "op": op["op"]} for i, op in enumerate(operations)]
+
+        ids = {op["id"] for op in operations if op["op"] != "create"}
+        tasks = Task.objects.filter(owner=request.user, pk__in=ids).in_bulk()
+
+        creates = [i for i, op in enumerate(operations) if op["op"] == "create"]
+        create_serializer = TaskSerializer(
+            data=[operations[i]["data"] for i in creates], many=True
+        )
+        if not create_serializer.is_valid():
+            for i, errors in zip(creates, create_serializer.errors):
+                if errors:
+                    results[i].update(status="invalid", errors=errors)
+
+        updated, deleted = {}, set()
+        for i, op in enumerate(operations):
+            if op["op"] == "create":
+                continue
+            results[i]["id"] = op["id"]
+            task = tasks.get(op["id"])
+            if task is None:
+                results[i].update(status="not_found", errors={"id": "Task not found"})
+            elif op["op"] == "delete":
+                deleted.add(task.pk)
+            else:
+                task_serializer = TaskSerializer(task, data=op["data"], partial=True)
+                if task_serializer.is_valid():
+                    for attr, value in task_serializer.validated_data.items():
+                        setattr(task, attr, value)
+                    updated[task.pk] = task
+                else:
+                    results[i].update(status="invalid", errors=task_serializer.errors)
+
+        if any("errors" in result for result in results):
+            return CustomResponse(
+                data={"results": results},
+                status=status.HTTP_400_BAD_REQUEST,
+                message="Some operations are invalid; nothing was saved",
+            )
+
+        now = timezone.now()
+        for task in updated.values():
+            task.updated_at = now
+        with transaction.atomic():
+            created = Task.objects.bulk_create(
+                Task(owner=request.user, **data)
+                for data in create_serializer.validated_data
+            )
+            Task.objects.bulk_update(updated.values(), self.update_fields)
+            Task.objects.filter(owner=request.user, pk__in=deleted).delete()
+            # bulk_create/bulk_update don't send save signals
+            invalidate_task_stats(request.user.pk)
+
+        for i, task in zip(creates, created):
+            results[i].update(
+                status="created", id=task.pk, data=SampleTaskSerializer(task).data
+            )
+        for result in results:
+            if result["op"] == "update":
+                task = updated[result["id"]]
+                result.update(status="updated", data=SampleTaskSerializer(task).data)
+            elif result["op"] == "delete":
+                result["status"] = "deleted"
+
+        return CustomResponse(
+            data={"results": results},
+            status=status.HTTP_200_OK,
+            message="Bulk operations applied successfully",
+        )
+
+
+class TaskChangesView(APIView):
+    """
+    Delta sync: tasks changed after a watermark plus ids of deleted tasks.
+
+    Clients pass the ``next`` values of the previous response back as
+    query parameters (omit them all for a full sync) and keep calling while
+    ``has_more`` is true. Tasks are paged by ``(updated_at, id)`` and
+    tombstones by id, each from the last row served.
+
+    Tombstones are kept for TASK_TOMBSTONE_RETENTION (see the
+    prune_tombstones command). ``synced_at`` records when the client last
+    caught up; once that is older than the retention window deletions may
+    have been pruned, and the response is 410 Gone: start a full sync.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    page_size = 500
+
+    def get(self, request):
+        params = request.query_params
+        since = params.get("since")
+        now = timezone.now()
+
+        tasks = Task.objects.filter(owner=request.user).order_by("updated_at", "id")
+        tombstones = TaskTombstone.objects.filter(owner=request.user).order_by("id")
+
+        if since:
+            try:
+                # ValueError covers well-formed but out-of-range datetimes too
+                parsed_since = parse_datetime(since)
+                synced_at = parse_datetime(params.get("synced_at", ""))
+                after_id = int(params.get("after_id", 0))
+                deleted_after = int(params.get("deleted_after", 0))
+            except (TypeError, ValueError):
+                parsed_since = None
+            if parsed_since is None:
+                return CustomResponse(
+                    status=status.HTTP_400_BAD_REQUEST,
+                    message=(
+                        "since and synced_at must be ISO 8601 datetimes, "
+                        "after_id and deleted_after integers"
+                    ),
+                )
+            if timezone.is_naive(parsed_since):
+                parsed_since = timezone.make_aware(parsed_since)
+            if synced_at is not None and timezone.is_naive(synced_at):
+                synced_at = timezone.make_aware(synced_at)
+            if synced_at is None or synced_at < now - tombstone_retention():
+                return CustomResponse(
+                    status=status.HTTP_410_GONE,
+                    message="Sync state expired; start a full sync",
+                )
+            tasks = tasks.filter(
+                Q(updated_at__gt=parsed_since)
+                | Q(updated_at=parsed_since, id__gt=after_id)
+            )
+            tombstones = tombstones.filter(id__gt=deleted_after)
+        else:
+            parsed_since, after_id, synced_at = None, 0, now
+            # A full sync returns every live task; nothing to delete. Read
+            # the tombstone watermark before the tasks, so tasks deleted
+            # meanwhile show up in the next delta.
+            deleted_after = tombstones.aggregate(last=Max("id"))["last"] or 0
+            tombstones = tombstones.none()
+
+        changed = list(tasks[: self.page_size + 1])
+        deleted = list(tombstones.values_list("id", "task_id")[: self.page_size + 1])
+        has_more = len(changed) > self.page_size or len(deleted) > self.page_size
+        changed, deleted = changed[: self.page_size], deleted[: self.page_size]
+
+        if changed:
+            next_since, next_after_id = changed[-1].updated_at, changed[-1].pk
+        else:
+            next_since, next_after_id = parsed_since, after_id
+        if deleted:
+            deleted_after = deleted[-1][0]
+
+        return CustomResponse(
+            data={
+                "changed": SampleTaskSerializer(changed, many=True).data,
+                "deleted": [task_id for _, task_id in deleted],
+                "has_more": has_more,
+                "next": {
+                    "since": next_since.isoformat() if next_since else None,
+                    "after_id": next_after_id,
+                    "deleted_after": deleted_after,
+                    # Only a complete catch-up moves this forward
+                    "synced_at": (synced_at if has_more else now).isoformat(),
+                },
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class TaskStatsView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return CustomResponse(
+            data=get_task_stats(request.user.pk), status=status.HTTP_200_OK
+        )
+
+
+class CommentPageView(APIView):
+    """
+    A cursor-paginated page of comments (``?cursor=``, ``?per_page=``), each
+    with up to ``?replies=`` of its replies and its reply count. Subclasses
+    define ``get_queryset(request, pk)``, returning None when ``pk`` isn't
+    visible to the user.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
+    not_found_message = None
+
+    def get(self, request, pk):
+        comments = self.get_queryset(request, pk)
+        if comments is None:
+            return CustomResponse(
+                data={},
+                message=self.not_found_message,
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(comments, request)
+        attach_reply_previews(
+            page, preview_queryset(page, reply_preview_size(request))
+        )
+        serializer = CommentSerializer(page, many=True, context={"request": request})
+        return CustomResponse(
+            data=serializer.data,
+            status=status.HTTP_200_OK,
+            pagination=paginator.get_pagination_meta(),
+        )
+
+
+class TaskCommentsView(CommentPageView):
+    """Top-level comments of a task, newest first."""
+
+    pagination_class = CommentCursorPagination
+    not_found_message = "Task not found"
+
+    def get_queryset(self, request, pk):
+        if not Task.objects.filter(pk=pk, owner=request.user).exists():
+            return None
+        return task_comments(pk)
+
+
+class CommentRepliesView(CommentPageView):
+    """Replies to a comment, oldest first; "load more replies"."""
+
+    pagination_class = ReplyCursorPagination
+    not_found_message = "Comment not found"
+
+    def get_queryset(self, request, pk):
+        if not Comment.objects.filter(pk=pk, task__owner=request.user).exists():
+            return None
+        return comment_replies(pk)
+
+
 class AddCommentView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -119,6 +498,7 @@ class AddCommentView(APIView):
         serializer = CommentSerializer(data=request.data, context={"request": request})
         if serializer.is_valid():
             serializer.save(task=task)
+            publish_task_event(task.pk, COMMENT_ADDED, serializer.data)
             return CustomResponse(
                 data=serializer.data,
                 message="Comment added successfully",
@@ -134,57 +514,59 @@ class CommentLikeAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, pk):
-        try:
-            comment = Comment.objects.get(pk=pk)
-            reaction_type = request.data.get(
-                "reaction_type", "like"
-            )  # Default to 'like' if not specified
+        reaction_type = request.data.get(
+            "reaction_type", "like"
+        )  # Default to 'like' if not specified
 
-            # Validate reaction type
-            if reaction_type not in dict(CommentLike.REACTION_CHOICES):
-                return CustomResponse(
-                    status=status.HTTP_400_BAD_REQUEST,
-                    message="Invalid reaction type",
-                )
-
-            # Check if a Like by this user already exists
-            like = comment.likes.filter(created_by=request.user).first()
-
-            if not like:
-                # Create a Like object with reaction
-                like = CommentLike.objects.create(
-                    created_by=request.user,
-                    comment=comment,
-                    reaction_type=reaction_type,
-                )
+        # Validate reaction type
+        if reaction_type not in dict(CommentLike.REACTION_CHOICES):
+            return CustomResponse(
+                status=status.HTTP_400_BAD_REQUEST,
+                message="Invalid reaction type",
+            )
 
-                message = f"Comment {reaction_type} reaction added successfully"
-            else:
-                if like.reaction_type == reaction_type:
-                    # If same reaction, remove it (unlike)
-                    like.delete()
-                    message = f"Comment {reaction_type} reaction removed successfully"
-                else:
-                    # If different reaction, update it
-                    like.reaction_type = reaction_type
-                    like.save()
-                    message = (
-                        f"Comment reaction updated to {reaction_type} successfully"
-                    )
-
-            serializer = CommentSerializer(comment, context={"request": request})
+        try:
+            action = CommentLike.objects.toggle(pk, request.user, reaction_type)
+        except Comment.DoesNotExist:
             return CustomResponse(
-                data=serializer.data,
-                status=status.HTTP_200_OK,
-                message=message,
+                status=status.HTTP_404_NOT_FOUND,
+                message="Comment not found",
             )
+        if action == "added":
+            message = f"Comment {reaction_type} reaction added successfully"
+        elif action == "removed":
+            message = f"Comment {reaction_type} reaction removed successfully"
+        else:
+            message = f"Comment reaction updated to {reaction_type} successfully"
 
+        try:
+            comment = Comment.objects.only(
+                "task_id", *Comment.reaction_fields()
+            ).get(pk=pk)
         except Comment.DoesNotExist:
             return CustomResponse(
                 status=status.HTTP_404_NOT_FOUND,
                 message="Comment not found",
             )
 
+        # Only the reaction summary changed; don't re-serialize the thread
+        summary = {
+            "id": comment.pk,
+            "reaction_type": None if action == "removed" else reaction_type,
+            "like_count": comment.reaction_total,
+            "reaction_counts": comment.reaction_counts,
+        }
+        publish_task_event(
+            comment.task_id,
+            REACTION_CHANGED,
+            {**summary, "user": request.user.pk, "action": action},
+        )
+        return CustomResponse(
+            data=summary,
+            status=status.HTTP_200_OK,
+            message=message,
+        )
+
 
 class UpdateCommentView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -204,8 +586,14 @@ class UpdateCommentView(APIView):
         )
         if serializer.is_valid():
             serializer.save()
+            comment = thread_queryset().get(pk=comment.pk)
+            attach_reply_previews(
+                [comment], preview_queryset([comment], reply_preview_size(request))
+            )
+            data = CommentSerializer(comment, context={"request": request}).data
+            publish_task_event(comment.task_id, COMMENT_UPDATED, data)
             return CustomResponse(
-                data=serializer.data,
+                data=data,
                 message="Comment updated successfully",
                 status=status.HTTP_200_OK,
             )
@@ -222,6 +610,7 @@ class DeleteCommentView(APIView):
         try:
             comment = Comment.objects.get(pk=pk)
             comment.delete()
+            publish_task_event(comment.task_id, COMMENT_DELETED, {"id": pk})
             return CustomResponse(
                 data={},
                 message="Comment deleted successfully",
@@ -0,0 +1,104 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import User
+from .tokens import USER_CLAIMS
+
+
+ACTIVE = "active"
+
+
+def user_state_cache():
+    alias = getattr(settings, "USER_STATE_CACHE", None)
+    return caches[alias] if alias else None
+
+
+def user_state_key(user_id):
+    return f"user:state:{user_id}"
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that builds request.user from the claims added by
+    ``user.tokens.RefreshToken`` instead of loading the row. Only the id and
+    the claimed fields are set; reading any other field loads the user once
+    (see ``User.refresh_from_db``).
+
+    The claims are only trusted for users the USER_STATE_CACHE alias knows
+    to exist and be active. That is recorded after a database lookup and
+    cleared whenever the user is saved or deleted, so the alias must be
+    shared by every process; leave it unset to always look the user up.
+    Tokens without the claims, and setups with CHECK_REVOKE_TOKEN, are
+    looked up too.
+    """
+
+    def get_user(self, validated_token):
+        user = self.get_claims_user(validated_token)
+        if user is None:
+            user = super().get_user(validated_token)
+            state = user_state_cache()
+            if state is not None:
+                # add(), not set(): a concurrent save or delete must win
+                state.add(user_state_key(user.pk), ACTIVE, self.state_timeout())
+        return user
+
+    async def aauthenticate(self, request):
+        """``authenticate`` for async views; only the fallback needs a query."""
+        header = self.get_header(request)
+        raw_token = header and self.get_raw_token(header)
+        if not raw_token:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        user = self.get_claims_user(validated_token)
+        if user is None:
+            user = await sync_to_async(self.get_user)(validated_token)
+        return user, validated_token
+
+    def get_claims_user(self, validated_token):
+        """The user the token's claims describe, or None to look it up."""
+        state = user_state_cache()
+        claims = {field: validated_token.get(field) for field in USER_CLAIMS}
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if (
+            state is None
+            or api_settings.CHECK_REVOKE_TOKEN
+            or user_id is None
+            or None in claims.values()
+            or state.get(user_state_key(user_id)) != ACTIVE
+        ):
+            return None
+
+        claims[api_settings.USER_ID_FIELD] = user_id
+        claims["is_active"] = True
+        fields = [f for f in User._meta.concrete_fields if f.attname in claims]
+        user = User.from_db(
+            router.db_for_read(User),
+            [f.attname for f in fields],
+            [f.to_python(claims[f.attname]) for f in fields],
+        )
+        user._token_claims = {
+            field: getattr(user, field) for field in (*USER_CLAIMS, "is_active")
+        }
+        return user
+
+    @staticmethod
+    def state_timeout():
+        return api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user_state(sender, instance, **kwargs):
+    state = user_state_cache()
+    if state is None:
+        return
+    key = user_state_key(instance.pk)
+    state.delete(key)
+    # Again once committed, in case a request re-read the old row meanwhile
+    transaction.on_commit(lambda: state.delete(key))
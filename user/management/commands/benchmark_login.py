@@ -0,0 +1,94 @@
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from core.benchmarks import scratch_database
+from user.models import User, UserProfile
+from user.views import LoginView
+
+
+class Command(BaseCommand):
+    help = (
+        "Time LoginView under concurrent load and report p50/p99 latency, "
+        "in a scratch copy of the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--concurrency", type=int, default=8)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.benchmark(options)
+
+    def benchmark(self, options):
+        users = self.seed(options["users"])
+        # Throttles would reject a benchmark's worth of logins
+        view = LoginView.as_view(throttle_classes=[])
+        factory = APIRequestFactory()
+
+        def login(i):
+            user = users[i % len(users)]
+            identifier = user.email if i % 2 else user.username
+            request = factory.post(
+                "/api/users/login/",
+                {"email_or_username": identifier, "password": "benchmark-pass"},
+                format="json",
+            )
+            started = time.perf_counter()
+            response = view(request)
+            elapsed = (time.perf_counter() - started) * 1000
+            if response.status_code != 200:
+                raise RuntimeError(f"Login failed: {response.status_code}")
+            return elapsed
+
+        def run(indices):
+            try:
+                return [login(i) for i in indices]
+            finally:
+                connections.close_all()
+
+        with CaptureQueriesContext(connection) as queries:
+            login(0)
+        self.stdout.write(f"{len(queries)} queries per login")
+
+        concurrency = options["concurrency"]
+        chunks = [
+            range(i, options["requests"], concurrency) for i in range(concurrency)
+        ]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            timings = sorted(t for chunk in pool.map(run, chunks) for t in chunk)
+        wall = time.perf_counter() - started
+
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+        self.stdout.write(
+            f"{len(timings)} logins, concurrency {concurrency}: "
+            f"p50 {statistics.median(timings):.1f} ms, p99 {p99:.1f} ms, "
+            f"{len(timings) / wall:.1f} logins/s"
+        )
+
+    def seed(self, count):
+        tag = uuid.uuid4().hex[:8]
+        password = make_password("benchmark-pass")
+        users = User.objects.bulk_create(
+            User(
+                email=f"bench-{tag}-{i}@example.com",
+                username=f"bench-{tag}-{i}",
+                first_name="Bench",
+                last_name=str(i),
+                password=password,
+                is_active=True,
+            )
+            for i in range(count)
+        )
+        UserProfile.objects.bulk_create(UserProfile(user=user) for user in users)
+        return users
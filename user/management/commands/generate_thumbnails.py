@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from user.models import UserProfile
+from user.thumbnails import DatabaseThumbnailQueue
+
+
+class Command(BaseCommand):
+    help = "Generate thumbnails for profiles with new pictures."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=20)
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between polls when nothing is pending",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Process pending profiles once and exit"
+        )
+        parser.add_argument(
+            "--backfill",
+            action="store_true",
+            help="Queue every profile that has a picture first",
+        )
+
+    def handle(self, *args, **options):
+        if options["backfill"]:
+            queued = UserProfile.objects.filter(
+                Q(profile_picture__gt="") | Q(cover_picture__gt="")
+            ).update(thumbnails_pending=True)
+            self.stdout.write(f"Queued {queued} profiles")
+
+        queue = DatabaseThumbnailQueue()
+        while True:
+            done = queue.drain(batch_size=options["batch_size"])
+            if done:
+                self.stdout.write(f"Generated thumbnails for {done} profiles")
+            if options["once"] and not done:
+                break
+            if not done:
+                time.sleep(options["interval"])
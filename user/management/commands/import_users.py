@@ -0,0 +1,188 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from core.mail import get_mail_queue
+from user.models import User, UserProfile
+from user.otp import get_otp_store
+
+
+def setup_worker():
+    # Workers started with "spawn" need their own configured Django
+    django.setup()
+
+
+def hash_password(raw_password):
+    return make_password(raw_password)
+
+
+class Command(BaseCommand):
+    help = (
+        "Import users from a CSV or JSONL file with email, first_name, last_name "
+        "and optional password columns. Users are created inactive and sent an "
+        "activation code, like RegisterView, unless --active is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "jsonl"])
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count(), help="Password hashing processes"
+        )
+        parser.add_argument(
+            "--active",
+            action="store_true",
+            help="Create active accounts and send no activation mail",
+        )
+        parser.add_argument(
+            "--code-ttl-days",
+            type=float,
+            default=7,
+            help="How long the mailed activation codes stay valid",
+        )
+
+    def handle(self, *args, **options):
+        file_format = options["format"] or (
+            "jsonl" if options["path"].endswith((".jsonl", ".json")) else "csv"
+        )
+        self.created = self.skipped = 0
+        self.started = time.monotonic()
+
+        with open(options["path"], newline="", encoding="utf-8") as handle, (
+            ProcessPoolExecutor(max_workers=options["workers"], initializer=setup_worker)
+        ) as pool:
+            rows = self.read_rows(handle, file_format)
+            while True:
+                chunk = list(islice(rows, options["chunk_size"]))
+                if not chunk:
+                    break
+                self.import_chunk(
+                    chunk,
+                    pool,
+                    options["active"],
+                    timedelta(days=options["code_ttl_days"]),
+                )
+                self.report()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Done: {self.created} users created, {self.skipped} skipped"
+            )
+        )
+
+    def read_rows(self, handle, file_format):
+        if file_format == "csv":
+            yield from csv.DictReader(handle)
+            return
+        for line_number, line in enumerate(handle, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as error:
+                raise CommandError(f"Line {line_number}: {error}")
+
+    def clean_chunk(self, chunk):
+        rows, seen = [], set()
+        for row in chunk:
+            email = User.objects.normalize_email((row.get("email") or "").strip())
+            try:
+                validate_email(email)
+            except ValidationError:
+                self.stderr.write(f"Skipping invalid email: {email!r}")
+                self.skipped += 1
+                continue
+            if email.lower() in seen:
+                self.skipped += 1
+                continue
+            seen.add(email.lower())
+            rows.append({**row, "email": email})
+
+        return self.drop_existing(rows)
+
+    def drop_existing(self, rows):
+        existing = set(
+            User.objects.filter(email__in=[row["email"] for row in rows]).values_list(
+                "email", flat=True
+            )
+        )
+        self.skipped += len(existing)
+        return [row for row in rows if row["email"] not in existing]
+
+    def import_chunk(self, chunk, pool, active, code_ttl):
+        rows = self.clean_chunk(chunk)
+        if not rows:
+            return
+
+        passwords = [row.get("password") or None for row in rows]
+        hashed = iter(
+            pool.map(hash_password, [p for p in passwords if p], chunksize=16)
+        )
+        for row, password in zip(rows, passwords):
+            row["password"] = next(hashed) if password else make_password(None)
+
+        for attempt in range(3):
+            try:
+                users = self.create_users(rows, active)
+                break
+            except IntegrityError:
+                # A concurrent insert took an allocated username or one of
+                # the emails; drop taken emails and allocate again
+                if attempt == 2:
+                    raise
+                rows = self.drop_existing(rows)
+                if not rows:
+                    return
+
+        if not active:
+            otp_store = get_otp_store()
+            get_mail_queue().enqueue_many(
+                (
+                    user.email,
+                    "Your OTP Code",
+                    f"Your OTP code is {otp_store.issue(user.email, ttl=code_ttl)}",
+                )
+                for user in users
+            )
+        self.created += len(users)
+
+    def create_users(self, rows, active):
+        usernames = User.objects.allocate_usernames(
+            [row["email"].split("@")[0] for row in rows]
+        )
+        users = [
+            User(
+                email=row["email"],
+                username=username,
+                first_name=(row.get("first_name") or "")[:50],
+                last_name=(row.get("last_name") or "")[:50],
+                password=row["password"],
+                is_active=active,
+            )
+            for row, username in zip(rows, usernames)
+        ]
+        with transaction.atomic():
+            # bulk_create skips post_save, so profiles are created here
+            users = User.objects.bulk_create(users)
+            UserProfile.objects.bulk_create(UserProfile(user=user) for user in users)
+        return users
+
+    def report(self):
+        elapsed = time.monotonic() - self.started
+        rate = self.created / elapsed if elapsed else 0
+        self.stdout.write(
+            f"{self.created} created, {self.skipped} skipped, {rate:.0f} users/s"
+        )
@@ -0,0 +1,20 @@
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from core.management.base import BatchDeleteCommand
+
+
+class Command(BatchDeleteCommand):
+    # Instead of flushexpiredtokens' single delete that loads every row
+    description = "Delete expired outstanding and blacklisted refresh tokens"
+    noun = "expired tokens"
+
+    def get_queryset(self):
+        return OutstandingToken.objects.filter(expires_at__lte=aware_utcnow())
+
+    def delete_batch(self, queryset, ids):
+        BlacklistedToken.objects.filter(token_id__in=ids).delete()
+        OutstandingToken.objects.filter(pk__in=ids).only("pk").delete()
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-18 01:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0002_one_time_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='cover_picture_thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to='users/cover_pictures/thumbnails/'),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='profile_picture_thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to='users/profile_pictures/thumbnails/'),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='thumbnails_pending',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+    ]
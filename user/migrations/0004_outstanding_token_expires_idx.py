@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Lets prune_tokens find expired tokens without scanning the table
+
+    dependencies = [
+        ("user", "0003_profile_thumbnails"),
+        ("token_blacklist", "0012_alter_outstandingtoken_user"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE INDEX IF NOT EXISTS outstanding_token_expires_idx "
+            "ON token_blacklist_outstandingtoken (expires_at)",
+            "DROP INDEX IF EXISTS outstanding_token_expires_idx",
+        ),
+    ]
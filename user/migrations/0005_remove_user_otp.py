@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-18 03:39
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0004_outstanding_token_expires_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='user',
+            name='otp',
+        ),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
 from django.db.models.signals import post_save
 from django.dispatch import receiver
@@ -8,29 +9,74 @@ from django.conf import settings
 
 
 class MyAccountManager(BaseUserManager):
+    # Random candidates tried per name when the plain name is taken
+    username_candidates = 3
+
+    def allocate_usernames(self, bases):
+        """
+        Return a free username for each base name, in order, with one indexed
+        ``username IN (...)`` query: the plain name if free, otherwise the
+        name with a short random suffix. Names are also unique among each
+        other. A concurrent insert can still take one; callers retry on the
+        unique constraint.
+        """
+        max_length = self.model._meta.get_field("username").max_length
+        options = []
+        for base in bases:
+            base = base[:max_length]
+            suffixed = [
+                f"{base[: max_length - 7]}@{uuid.uuid4().hex[:6]}"
+                for _ in range(self.username_candidates)
+            ]
+            options.append([base] + suffixed)
+
+        wanted = {name for names in options for name in names}
+        taken = set(
+            self.filter(username__in=wanted).values_list("username", flat=True)
+        )
+
+        usernames = []
+        for names in options:
+            username = next((name for name in names if name not in taken), None)
+            if username is None:
+                # Every random candidate taken too; just take a longer suffix
+                username = f"{names[0][: max_length - 13]}@{uuid.uuid4().hex[:12]}"
+            taken.add(username)
+            usernames.append(username)
+        return usernames
+
+    def allocate_username(self, base):
+        return self.allocate_usernames([base])[0]
+
+    def create_with_unique_username(self, base, **fields):
+        """
+        Save a new user named after ``base``, picking another free username
+        if a concurrent insert takes the allocated one.
+        """
+        for attempt in range(3):
+            user = self.model(username=self.allocate_username(base), **fields)
+            try:
+                with transaction.atomic(using=self._db):
+                    user.save(using=self._db)
+                return user
+            except IntegrityError:
+                if attempt == 2 or self.filter(email=fields.get("email")).exists():
+                    raise
+
     def create_user(self, first_name, last_name, email, password=None):
         if not email:
             raise ValueError("User must have an email address")
 
-        # Ensure username is unique
-        username = email.split("@")[0]  # Use the part before the @ as a base username
-        while User.objects.filter(username=username).exists():
-            # Append a short random string for uniqueness
-            random_string = uuid.uuid4().hex[:6]  # Take first 6 characters of a UUID
-            username = f"{username}@{random_string}"
-
-        user = self.model(
+        # Username is derived from the part before the @, made unique
+        return self.create_with_unique_username(
+            email.split("@")[0],
             email=self.normalize_email(email),
-            username=username,  # Auto-generated username
             first_name=first_name,
             last_name=last_name,
+            password=make_password(password),
+            is_active=False,
         )
 
-        user.set_password(password)
-        user.is_active = False
-        user.save(using=self._db)
-        return user
-
     def create_superuser(self, first_name, last_name, email, password):
         user = self.create_user(first_name, last_name, email, password)
         user.is_admin = True
@@ -62,7 +108,6 @@ class User(AbstractBaseUser):
     is_staff = models.BooleanField(default=False)
     is_active = models.BooleanField(default=False)
     is_superadmin = models.BooleanField(default=False)
-    otp = models.CharField(max_length=6, blank=True, null=True)
     source = models.CharField(choices=SOURCES, max_length=50, default="local")
 
     USERNAME_FIELD = "email"
@@ -73,6 +118,18 @@ class User(AbstractBaseUser):
     def __str__(self):
         return self.email
 
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # A user built from token claims (user.authentication) loads all its
+        # deferred fields on first access, and re-reads the claimed ones it
+        # hasn't changed since, as they may be out of date
+        claims = self.__dict__.pop("_token_claims", None)
+        if claims is not None and fields is not None:
+            fields = set(fields) | self.get_deferred_fields()
+            fields |= {
+                name for name, value in claims.items() if self.__dict__.get(name) == value
+            }
+        return super().refresh_from_db(using, fields, from_queryset)
+
     def has_perm(self, perm, obj=None):
         return self.is_admin
 
@@ -88,6 +145,14 @@ class UserProfile(models.Model):
     cover_picture = models.ImageField(
         upload_to="users/cover_pictures/", blank=True, null=True
     )
+    # Resized copies written by user.thumbnails; empty until generated
+    profile_picture_thumbnail = models.ImageField(
+        upload_to="users/profile_pictures/thumbnails/", blank=True, null=True
+    )
+    cover_picture_thumbnail = models.ImageField(
+        upload_to="users/cover_pictures/thumbnails/", blank=True, null=True
+    )
+    thumbnails_pending = models.BooleanField(default=False, db_index=True)
     country = models.CharField(max_length=50, blank=True, null=True)
     city = models.CharField(max_length=50, blank=True, null=True)
     bio = models.TextField(max_length=500, blank=True, null=True)
@@ -125,6 +190,18 @@ class UserProfile(models.Model):
             return self.cover_picture.url
         return "/static/default_images/beach_1.jpg"
 
+    @property
+    def get_profile_picture_thumbnail(self):
+        if self.profile_picture_thumbnail:
+            return self.profile_picture_thumbnail.url
+        return self.get_profile_picture
+
+    @property
+    def get_cover_picture_thumbnail(self):
+        if self.cover_picture_thumbnail:
+            return self.cover_picture_thumbnail.url
+        return self.get_cover_picture
+
     @property
     def full_name(self):
         return f"{self.user.first_name} {self.user.last_name}"
@@ -137,6 +214,18 @@ class UserProfile(models.Model):
         return f"{self.user.first_name} {self.user.last_name} Profile"
 
 
+class OneTimeCode(models.Model):
+    """Hashed OTP storage used by user.otp.DatabaseOTPStore."""
+
+    email = models.EmailField(max_length=100, unique=True)
+    code_hash = models.CharField(max_length=64)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"OTP for {self.email} (expires {self.expires_at})"
+
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
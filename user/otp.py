@@ -0,0 +1,157 @@
+import hashlib
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import F
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.module_loading import import_string
+
+from .models import OneTimeCode
+
+
+class BaseOTPStore:
+    """
+    Issues and checks one-time codes per email address. Only an HMAC of the
+    code is stored; codes expire after ``ttl`` and are discarded after
+    ``max_attempts`` wrong guesses.
+    """
+
+    ttl = timedelta(minutes=10)
+    max_attempts = 5
+
+    def __init__(self):
+        self.ttl = getattr(settings, "OTP_TTL", self.ttl)
+        self.max_attempts = getattr(settings, "OTP_MAX_ATTEMPTS", self.max_attempts)
+
+    @staticmethod
+    def normalize(email):
+        return email.strip().lower()
+
+    @staticmethod
+    def hash_code(email, code):
+        return salted_hmac("user.otp", f"{email}:{code}").hexdigest()
+
+    @staticmethod
+    def generate_code():
+        return str(secrets.randbelow(9000) + 1000)
+
+    def issue(self, email, ttl=None):
+        """
+        Create a new code for ``email``, replacing any previous one. It
+        expires after ``ttl`` if given, e.g. for codes sent in bulk mail.
+        """
+        email = self.normalize(email)
+        code = self.generate_code()
+        self.save(email, self.hash_code(email, code), ttl or self.ttl)
+        return code
+
+    def verify(self, email, code, consume=True):
+        """
+        Check ``code``; a correct code is discarded unless ``consume`` is
+        False (call ``clear`` once the action it guards has completed).
+        """
+        email = self.normalize(email)
+        stored = self.load(email)
+        if stored is None:
+            return False
+        if not constant_time_compare(stored, self.hash_code(email, str(code))):
+            if self.record_failure(email) >= self.max_attempts:
+                self.clear(email)
+            return False
+        if consume:
+            self.clear(email)
+        return True
+
+    def save(self, email, code_hash, ttl):
+        raise NotImplementedError
+
+    def load(self, email):
+        raise NotImplementedError
+
+    def record_failure(self, email):
+        """Count a wrong guess and return the number of failures so far."""
+        raise NotImplementedError
+
+    def clear(self, email):
+        raise NotImplementedError
+
+
+class CacheOTPStore(BaseOTPStore):
+    """
+    Keeps codes in the OTP_CACHE cache alias, which must be shared by every
+    process and persistent enough to outlive ``ttl``; a code issued by one
+    worker has to verify on another.
+    """
+
+    def __init__(self):
+        super().__init__()
+        alias = getattr(settings, "OTP_CACHE", None)
+        if not alias:
+            raise ImproperlyConfigured(
+                "CacheOTPStore needs OTP_CACHE set to a shared cache alias."
+            )
+        self.cache = caches[alias]
+
+    def key(self, email, suffix):
+        digest = hashlib.sha256(email.encode()).hexdigest()
+        return f"user:otp:{digest}:{suffix}"
+
+    def save(self, email, code_hash, ttl):
+        timeout = ttl.total_seconds()
+        self.cache.set(self.key(email, "code"), code_hash, timeout)
+        self.cache.set(self.key(email, "attempts"), 0, timeout)
+
+    def load(self, email):
+        return self.cache.get(self.key(email, "code"))
+
+    def record_failure(self, email):
+        try:
+            return self.cache.incr(self.key(email, "attempts"))
+        except ValueError:  # expired between load() and here
+            return self.max_attempts
+
+    def clear(self, email):
+        self.cache.delete_many([self.key(email, "code"), self.key(email, "attempts")])
+
+
+class DatabaseOTPStore(BaseOTPStore):
+    """Keeps codes in the OneTimeCode table; the default."""
+
+    def save(self, email, code_hash, ttl):
+        OneTimeCode.objects.update_or_create(
+            email=email,
+            defaults={
+                "code_hash": code_hash,
+                "attempts": 0,
+                "expires_at": timezone.now() + ttl,
+            },
+        )
+
+    def load(self, email):
+        return (
+            OneTimeCode.objects.filter(email=email, expires_at__gt=timezone.now())
+            .values_list("code_hash", flat=True)
+            .first()
+        )
+
+    def record_failure(self, email):
+        OneTimeCode.objects.filter(email=email).update(attempts=F("attempts") + 1)
+        attempts = (
+            OneTimeCode.objects.filter(email=email)
+            .values_list("attempts", flat=True)
+            .first()
+        )
+        return self.max_attempts if attempts is None else attempts
+
+    def clear(self, email):
+        OneTimeCode.objects.filter(email=email).delete()
+
+
+def get_otp_store():
+    return import_string(
+        getattr(settings, "OTP_STORE_BACKEND", "user.otp.DatabaseOTPStore")
+    )()
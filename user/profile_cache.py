@@ -0,0 +1,60 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.caching import InvalidatedCache
+from .models import User, UserProfile
+from .serializers import UserSerializer
+
+PICTURE_FIELDS = (
+    "profile_picture",
+    "profile_picture_thumbnail",
+    "cover_picture",
+    "cover_picture_thumbnail",
+)
+
+profile_cache = InvalidatedCache("PROFILE_CACHE", "PROFILE_CACHE_TIMEOUT")
+
+
+def profile_cache_key(user_id, year):
+    # Keyed by year too, since "age" and "is_adult" roll over with it
+    return f"user:profile:{user_id}:{year}"
+
+
+def get_profile_data(user, request=None):
+    """
+    Serialized ``UserSerializer`` payload for ``user``, cached with relative
+    picture URLs so one entry serves every host; they are made absolute
+    per request.
+    """
+    key = profile_cache_key(user.pk, timezone.localdate().year)
+    data = profile_cache.get(key)
+    if data is None:
+        data = UserSerializer(user).data
+        profile_cache.set(key, data)
+
+    profile = data.get("profile")
+    if request is not None and profile:
+        profile = dict(profile)
+        for field in PICTURE_FIELDS:
+            profile[field] = request.build_absolute_uri(profile[field])
+        data = {**data, "profile": profile}
+    return data
+
+
+def invalidate_profile(user_id):
+    profile_cache.delete_on_commit(
+        profile_cache_key(user_id, timezone.localdate().year)
+    )
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    invalidate_profile(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def profile_changed(sender, instance, **kwargs):
+    invalidate_profile(instance.user_id)
@@ -1,7 +1,12 @@
+from dj_rest_auth.jwt_auth import CookieTokenRefreshSerializer
+from django.db import IntegrityError
 from rest_framework import serializers
 from .models import User, UserProfile
-from rest_framework_simplejwt.tokens import RefreshToken
+from .tokens import RefreshToken
 from django.utils import timezone
+from .otp import get_otp_store
+from .thumbnails import THUMBNAILS
+from .uploads import BoundedImageField
 
 
 class SampleUserData(serializers.ModelSerializer):
@@ -21,7 +26,9 @@ class SampleUserData(serializers.ModelSerializer):
 
 class UserProfileSerializer(serializers.ModelSerializer):
     profile_picture = serializers.SerializerMethodField()
+    profile_picture_thumbnail = serializers.SerializerMethodField()
     cover_picture = serializers.SerializerMethodField()
+    cover_picture_thumbnail = serializers.SerializerMethodField()
 
     class Meta:
         model = UserProfile
@@ -39,7 +46,9 @@ class UserProfileSerializer(serializers.ModelSerializer):
             "marital_status",
             "bio",
             "profile_picture",
+            "profile_picture_thumbnail",
             "cover_picture",
+            "cover_picture_thumbnail",
             "work",
             "education",
         ]
@@ -54,6 +63,16 @@ class UserProfileSerializer(serializers.ModelSerializer):
         url = obj.get_cover_picture
         return request.build_absolute_uri(url) if request else url
 
+    def get_profile_picture_thumbnail(self, obj):
+        request = self.context.get("request")
+        url = obj.get_profile_picture_thumbnail
+        return request.build_absolute_uri(url) if request else url
+
+    def get_cover_picture_thumbnail(self, obj):
+        request = self.context.get("request")
+        url = obj.get_cover_picture_thumbnail
+        return request.build_absolute_uri(url) if request else url
+
 
 class UserSerializer(serializers.ModelSerializer):
     profile = UserProfileSerializer(source="userprofile", read_only=True)
@@ -117,8 +136,8 @@ class ResetPasswordSerializer(serializers.Serializer):
 
     def validate_otp(self, value):
         """Validate the OTP"""
-        user = User.objects.get(email=self.initial_data["email"])
-        if user.otp != value:
+        # Not consumed yet: the reset can still be refused (e.g. reused password)
+        if not get_otp_store().verify(self.initial_data["email"], value, consume=False):
             raise serializers.ValidationError("Invalid OTP")
         return value
 
@@ -128,11 +147,10 @@ class ResetPasswordSerializer(serializers.Serializer):
 
         user = User.objects.get(email=email)
         user.set_password(new_password)
-        user.save()
+        user.save(update_fields=["password"])
 
         # Clear OTP after successful reset
-        user.otp = None
-        user.save()
+        get_otp_store().clear(email)
 
 
 class ForgotPasswordSerializer(serializers.Serializer):
@@ -150,7 +168,7 @@ class SocialLoginSerializer(serializers.Serializer):
     last_name = serializers.CharField(
         required=False, allow_blank=True
     )  # Optional for login
-    profile_image = serializers.ImageField(
+    profile_image = BoundedImageField(
         required=False, allow_null=True
     )  # Optional for login
     source = serializers.CharField(
@@ -165,17 +183,24 @@ class SocialLoginSerializer(serializers.Serializer):
         source = validated_data.get("source", "local")
         image = validated_data.get("profile_image", None)
 
-        user, created = User.objects.get_or_create(
-            email=email,
-            defaults={
-                "username": username,
-                "first_name": first_name,
-                "last_name": last_name,
-                "source": source,
-            },
-        )
+        user = User.objects.filter(email=email).first()
+        created = user is None
+        if created:
+            try:
+                user = User.objects.create_with_unique_username(
+                    username or email.split("@")[0],
+                    email=email,
+                    first_name=first_name,
+                    last_name=last_name,
+                    source=source,
+                )
+            except IntegrityError:
+                # Signed up concurrently with the same email
+                user = User.objects.get(email=email)
+                created = False
         if created and image:
             user.userprofile.profile_picture = image
+            user.userprofile.thumbnails_pending = True
             user.userprofile.save()
 
         refresh = RefreshToken.for_user(user)
@@ -189,6 +214,8 @@ class SocialLoginSerializer(serializers.Serializer):
 
 class UserProfileUpdate(serializers.ModelSerializer):
     user = SampleUserData()
+    profile_picture = BoundedImageField(required=False, allow_null=True)
+    cover_picture = BoundedImageField(required=False, allow_null=True)
 
     class Meta:
         model = UserProfile
@@ -218,5 +245,15 @@ class UserProfileUpdate(serializers.ModelSerializer):
             user.save()
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
+        for source_field, (field, _, _) in THUMBNAILS.items():
+            if source_field in validated_data:
+                # Serve the new original until the worker has resized it
+                getattr(instance, field).delete(save=False)
+                instance.thumbnails_pending = True
         instance.save()
         return instance
+
+
+class TokenRefreshSerializer(CookieTokenRefreshSerializer):
+    # Rotate with the app's token class so its blacklist cache is used
+    token_class = RefreshToken
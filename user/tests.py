@@ -1,3 +1,643 @@
-from django.test import TestCase
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import BytesIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image, ImageFile
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.tokens import RefreshToken as PlainRefreshToken
+
+from core.models import OutboundEmail
+from core.throttling import IPRateThrottle
+from todos.serializers import SampleUserProfileData
+from .models import OneTimeCode, User, UserProfile
+from .authentication import ClaimsJWTAuthentication
+from .otp import get_otp_store
+from .tokens import RefreshToken
+from .uploads import SizeLimitedUploadHandler
+
+
+class OTPFlowTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user("Otp", "User", "otp@example.com", "old-pass-123")
+
+    def last_code(self):
+        body = OutboundEmail.objects.latest("pk").body
+        return re.search(r"\d{4}", body).group()
+
+    def activate(self, otp, email="otp@example.com"):
+        return self.client.post(reverse("activate_user"), {"email": email, "otp": otp})
+
+    @staticmethod
+    def wrong(code):
+        return "1111" if code == "0000" else "0000"
+
+    def test_activation_checks_code_once(self):
+        self.client.post(reverse("resend_code"), {"email": "otp@example.com"})
+        code = self.last_code()
+
+        self.assertEqual(self.activate(self.wrong(code)).status_code, 400)
+        self.assertEqual(self.activate(code).status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_active)
+        # Codes are single use
+        self.assertEqual(self.activate(code).status_code, 400)
+
+    def test_code_discarded_after_too_many_attempts(self):
+        self.client.post(reverse("resend_code"), {"email": "otp@example.com"})
+        code = self.last_code()
+
+        for _ in range(5):
+            self.assertEqual(self.activate(self.wrong(code)).status_code, 400)
+        self.assertEqual(self.activate(code).status_code, 400)
+
+    def test_unknown_email(self):
+        response = self.client.post(reverse("resend_code"), {"email": "nobody@example.com"})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.activate("1234", email="nobody@example.com").status_code, 404)
+
+    def test_password_reset_with_database_store(self):
+        self.client.post(reverse("forget_password"), {"email": "otp@example.com"})
+        code = self.last_code()
+        self.assertEqual(OneTimeCode.objects.get().email, "otp@example.com")
+        self.assertNotIn(code, OneTimeCode.objects.get().code_hash)
+
+        reset = {"email": "otp@example.com", "otp": code, "new_password": "old-pass-123"}
+        response = self.client.post(reverse("reset_password"), reset)
+        self.assertEqual(response.status_code, 400)  # reused password; code kept
+
+        reset["new_password"] = "new-pass-456"
+        response = self.client.post(reverse("reset_password"), reset)
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password("new-pass-456"))
+        self.assertFalse(OneTimeCode.objects.exists())
+
+    @override_settings(OTP_STORE_BACKEND="user.otp.CacheOTPStore", OTP_CACHE="default")
+    def test_cache_store(self):
+        self.client.post(reverse("resend_code"), {"email": "otp@example.com"})
+        self.assertFalse(OneTimeCode.objects.exists())
+        self.assertEqual(self.activate(self.last_code()).status_code, 200)
+
+    @override_settings(OTP_STORE_BACKEND="user.otp.CacheOTPStore")
+    def test_cache_store_requires_a_cache_alias(self):
+        with self.assertRaises(ImproperlyConfigured):
+            get_otp_store()
+
+
+@override_settings(
+    REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        "DEFAULT_THROTTLE_RATES": {
+            "login_ip": "5/min",
+            "login_account": "3/min",
+            "otp_ip": "5/hour",
+            "otp_account": "2/hour",
+        },
+    }
+)
+class AuthRateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        User.objects.create_user("Rate", "Limited", "rate@example.com", "pass-1234")
+
+    def login(self, email="rate@example.com", ip="10.0.0.1"):
+        return self.client.post(
+            reverse("login"),
+            {"email_or_username": email, "password": "wrong"},
+            REMOTE_ADDR=ip,
+        )
+
+    def test_login_limited_per_account_before_password_check(self):
+        responses = [self.login() for _ in range(3)]
+        self.assertEqual([r.status_code for r in responses], [401] * 3)
+        self.assertEqual(
+            [r["X-RateLimit-Remaining"] for r in responses], ["2", "1", "0"]
+        )
+
+        with mock.patch.object(User, "check_password") as check_password:
+            response = self.login(ip="10.0.0.2")
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+        check_password.assert_not_called()
+
+    def test_login_limited_per_ip(self):
+        statuses = [self.login(email=f"user{i}@example.com").status_code for i in range(6)]
+        self.assertEqual(statuses, [401] * 5 + [429])
+        self.assertEqual(self.login(ip="10.0.0.2").status_code, 401)
+
+    def test_resend_code_limited_before_mail_is_queued(self):
+        for _ in range(2):
+            response = self.client.post(reverse("resend_code"), {"email": "rate@example.com"})
+            self.assertEqual(response.status_code, 200)
+
+        response = self.client.post(reverse("resend_code"), {"email": "rate@example.com"})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(OutboundEmail.objects.count(), 2)
+
+    def test_concurrent_requests_cannot_share_a_token(self):
+        class Throttle(IPRateThrottle):
+            scope = "login_ip"
+
+        get = LocMemCache.get
+
+        def slow_get(*args, **kwargs):
+            # Widen the gap between reading and writing the bucket
+            value = get(*args, **kwargs)
+            time.sleep(0.01)
+            return value
+
+        factory = APIRequestFactory()
+
+        def attempt(_):
+            request = factory.post("/", REMOTE_ADDR="10.0.0.9")
+            return Throttle().allow_request(request, None)
+
+        # Each thread has its own cache instance, so patch the class
+        with mock.patch.object(LocMemCache, "get", slow_get):
+            with ThreadPoolExecutor(max_workers=10) as pool:
+                allowed = list(pool.map(attempt, range(10)))
+        self.assertEqual(allowed.count(True), 5)
+
+
+class LoginTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user("Log", "In", "login@example.com", "pass-1234")
+        User.objects.filter(pk=self.user.pk).update(
+            is_active=True, username="login@a1b2c3"
+        )
+
+    def login(self, identifier, password="pass-1234"):
+        return self.client.post(
+            reverse("login"), {"email_or_username": identifier, "password": password}
+        )
+
+    def test_single_lookup_by_email_or_username(self):
+        for identifier in ("login@example.com", "login@a1b2c3"):
+            # user + profile in one query, plus the outstanding token insert
+            with self.assertNumQueries(2):
+                response = self.login(identifier)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data["data"]["user_data"]["profile"]["full_name"], "Log In")
+
+        self.assertEqual(self.login("missing@example.com").status_code, 401)
+
+    @override_settings(
+        PASSWORD_HASHERS=[
+            "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+            "django.contrib.auth.hashers.MD5PasswordHasher",
+        ]
+    )
+    def test_outdated_hash_upgraded_on_login(self):
+        User.objects.filter(pk=self.user.pk).update(
+            password=make_password("pass-1234", hasher="md5")
+        )
+
+        self.assertEqual(self.login("login@example.com").status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+        self.assertEqual(self.login("login@example.com").status_code, 200)
+
+
+class UsernameAllocationTests(TestCase):
+    def test_colliding_local_parts_get_unique_usernames(self):
+        first = User.objects.create_user("A", "A", "john@one.com", "pass")
+        self.assertEqual(first.username, "john")
+
+        for domain in ("two.com", "three.com"):
+            # savepoint, username lookup, insert, profile insert, release
+            with self.assertNumQueries(5):
+                user = User.objects.create_user("A", "A", f"john@{domain}", "pass")
+            self.assertTrue(user.username.startswith("john@"))
+        self.assertEqual(User.objects.filter(username__startswith="john").count(), 3)
+
+    def test_batch_allocation_is_unique_within_batch(self):
+        User.objects.create_user("A", "A", "sam@one.com", "pass")
+
+        with self.assertNumQueries(1):
+            usernames = User.objects.allocate_usernames(["sam", "sam", "kim", "kim"])
+
+        self.assertEqual(len(set(usernames)), 4)
+        self.assertNotIn("sam", usernames)
+        self.assertIn("kim", usernames)
+
+    def test_long_local_part_fits_column(self):
+        User.objects.create_user("A", "A", f"{'x' * 60}@one.com", "pass")
+        user = User.objects.create_user("A", "A", f"{'x' * 60}@two.com", "pass")
+        self.assertLessEqual(len(user.username), 50)
+
+    def test_social_login_deduplicates_username(self):
+        User.objects.create_user("A", "A", "jane@one.com", "pass")
+
+        response = APIClient().post(
+            reverse("social_login"),
+            {"email": "jane@other.com", "username": "jane", "source": "google"},
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertNotEqual(User.objects.get(email="jane@other.com").username, "jane")
+
+
+class ImportUsersCommandTests(TestCase):
+    def import_file(self, content, suffix, *args):
+        with tempfile.NamedTemporaryFile("w", suffix=suffix) as handle:
+            handle.write(content)
+            handle.flush()
+            call_command(
+                "import_users", handle.name, "--workers", "1", "--chunk-size", "2",
+                *args, stdout=mock.MagicMock(), stderr=mock.MagicMock(),
+            )
+
+    def test_csv_import_creates_users_profiles_and_activation_mail(self):
+        User.objects.create_user("A", "A", "taken@example.com", "pass")
+
+        self.import_file(
+            "email,first_name,last_name,password\n"
+            "ann@example.com,Ann,Lee,secret-1\n"
+            "taken@example.com,Dup,User,secret-2\n"
+            "not-an-email,Bad,Row,secret-3\n"
+            "ann@example.com,Ann,Again,secret-4\n"
+            "bo@example.com,Bo,Kim,\n",
+            ".csv",
+        )
+
+        ann = User.objects.get(email="ann@example.com")
+        self.assertFalse(ann.is_active)
+        self.assertTrue(ann.check_password("secret-1"))
+        self.assertFalse(User.objects.get(email="bo@example.com").has_usable_password())
+        self.assertEqual(User.objects.count(), 3)
+        self.assertEqual(UserProfile.objects.count(), 3)
+
+        queued = OutboundEmail.objects.filter(status="pending")
+        self.assertEqual(
+            sorted(queued.values_list("to", flat=True)),
+            ["ann@example.com", "bo@example.com"],
+        )
+        code = re.search(r"\d{4}", queued.get(to="ann@example.com").body).group()
+        # Bulk onboarding mail gets a week, not the usual ten minutes
+        expires_at = OneTimeCode.objects.get(email="ann@example.com").expires_at
+        self.assertGreater(expires_at, timezone.now() + timedelta(days=6))
+        self.assertTrue(get_otp_store().verify("ann@example.com", code))
+
+    def test_username_collision_retries_the_chunk(self):
+        User.objects.create_user("Taken", "Name", "taken@example.com", "pass")
+        allocate = User.objects.allocate_usernames
+        with mock.patch.object(
+            User.objects,
+            "allocate_usernames",
+            side_effect=[["taken", "free"], allocate(["ann", "bo"])],
+        ):
+            self.import_file(
+                "email,first_name,last_name\n"
+                "ann@example.com,Ann,Lee\n"
+                "bo@example.com,Bo,Kim\n",
+                ".csv",
+            )
+
+        self.assertEqual(
+            sorted(User.objects.values_list("username", flat=True)),
+            ["ann", "bo", "taken"],
+        )
+
+    def test_jsonl_import_with_active_flag_sends_no_mail(self):
+        rows = [
+            {"email": "kai@example.com", "first_name": "Kai", "password": "pw"},
+            {"email": "kai@other.com", "first_name": "Kai", "password": "pw"},
+        ]
+        self.import_file("\n".join(json.dumps(row) for row in rows), ".jsonl", "--active")
+
+        users = User.objects.filter(email__startswith="kai@")
+        self.assertEqual(users.filter(is_active=True).count(), 2)
+        self.assertEqual(len(set(users.values_list("username", flat=True))), 2)
+        self.assertFalse(OutboundEmail.objects.exists())
+
+
+class ProfileCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("Pat", "Lee", "pat@example.com", "pass")
+        self.client = APIClient()
+
+    def get_profile(self):
+        # A fresh instance each time, as the authentication backend would load
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.get(reverse("profile"))
+
+    def test_second_read_is_served_from_cache(self):
+        # The user lookup, plus the lazy userprofile load on a miss
+        with self.assertNumQueries(2):
+            first = self.get_profile()
+        with self.assertNumQueries(1):
+            second = self.get_profile()
+
+        self.assertEqual(first.data["data"], second.data["data"])
+        self.assertTrue(
+            second.data["data"]["profile"]["profile_picture"].startswith("http://testserver/")
+        )
+
+    def test_update_and_model_saves_invalidate(self):
+        self.get_profile()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                reverse("update_profile"), {"city": "Cairo"}, format="json"
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_profile().data["data"]["profile"]["city"], "Cairo")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = "Sam"
+            self.user.save()
+        self.assertEqual(self.get_profile().data["data"]["first_name"], "Sam")
+
+
+class ProfileThumbnailTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.user = User.objects.create_user("Pat", "Lee", "pat@example.com", "pass")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload_picture(self):
+        output = BytesIO()
+        Image.new("RGB", (800, 600), "red").save(output, "PNG")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                reverse("update_profile"),
+                {"profile_picture": SimpleUploadedFile("me.png", output.getvalue())},
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, 200)
+        return UserProfile.objects.get(user=self.user)
+
+    def test_worker_generates_thumbnail_after_upload(self):
+        profile = self.upload_picture()
+        self.assertTrue(profile.thumbnails_pending)
+        # Until the worker runs the original is served in its place
+        self.assertEqual(profile.get_profile_picture_thumbnail, profile.profile_picture.url)
+
+        call_command("generate_thumbnails", "--once", stdout=mock.MagicMock())
+
+        profile.refresh_from_db()
+        self.assertFalse(profile.thumbnails_pending)
+        self.assertTrue(profile.profile_picture_thumbnail.name.endswith(".webp"))
+        with Image.open(profile.profile_picture_thumbnail.path) as image:
+            self.assertEqual(image.size, (128, 128))
+        self.assertLess(
+            profile.profile_picture_thumbnail.size, profile.profile_picture.size
+        )
+        self.assertFalse(profile.cover_picture_thumbnail)
+
+    @override_settings(THUMBNAIL_QUEUE_BACKEND="user.thumbnails.ImmediateThumbnailQueue")
+    def test_comment_avatars_use_thumbnail(self):
+        profile = self.upload_picture()
+
+        self.assertFalse(profile.thumbnails_pending)
+        self.assertEqual(
+            SampleUserProfileData(profile).data["profile_picture"],
+            profile.profile_picture_thumbnail.url,
+        )
+
+
+class ProfileImageUploadTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.user = User.objects.create_user("Pat", "Lee", "pat@example.com", "pass")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, content, name="photo.jpg"):
+        return self.client.put(
+            reverse("update_profile"),
+            {"cover_picture": SimpleUploadedFile(name, content)},
+            format="multipart",
+        )
+
+    def image_bytes(self, size, image_format="JPEG", **options):
+        output = BytesIO()
+        Image.effect_noise(size, 64).convert("RGB").save(output, image_format, **options)
+        return output.getvalue()
+
+    @override_settings(UPLOAD_MAX_SIZE=4096)
+    def test_oversized_upload_is_rejected_with_its_size(self):
+        with mock.patch.object(
+            SizeLimitedUploadHandler,
+            "receive_data_chunk",
+            autospec=True,
+            side_effect=SizeLimitedUploadHandler.receive_data_chunk,
+        ) as receive:
+            response = self.upload(self.image_bytes((200, 200), "PNG"), "big.png")
+        self.assertTrue(receive.called)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("at most 4.0", str(response.data["data"]["cover_picture"]))
+        self.assertFalse(UserProfile.objects.get(user=self.user).cover_picture)
+
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=100 * 100)
+    def test_dimensions_are_checked_from_the_header(self):
+        content = self.image_bytes((101, 100))
+        with mock.patch.object(ImageFile.ImageFile, "load", side_effect=AssertionError):
+            response = self.upload(content)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("too large", str(response.data["data"]["cover_picture"]))
+
+    @override_settings(IMAGE_MAX_DIMENSION=64)
+    def test_metadata_is_stripped_and_image_scaled_down(self):
+        exif = Image.Exif()
+        exif[0x010F] = "Camera Maker"
+        exif[0x0112] = 6  # rotated 90 degrees
+        response = self.upload(self.image_bytes((300, 200), exif=exif.tobytes()))
+
+        self.assertEqual(response.status_code, 200)
+        picture = UserProfile.objects.get(user=self.user).cover_picture
+        self.assertEqual(os.path.splitext(picture.name)[1], ".jpg")
+        with Image.open(picture.path) as image:
+            self.assertEqual(image.size, (43, 64))
+            self.assertNotIn("exif", image.info)
+
+
+@override_settings(USER_STATE_CACHE="default")
+class ClaimsJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("Pat", "Lee", "pat@example.com", "pass")
+        User.objects.filter(pk=self.user.pk).update(is_active=True)
+        self.user.refresh_from_db()
+
+    def authenticate(self, token):
+        request = APIRequestFactory().get(
+            "/", HTTP_AUTHORIZATION=f"Bearer {token.access_token}"
+        )
+        return ClaimsJWTAuthentication().authenticate(request)[0]
+
+    def test_user_is_built_from_claims_and_loaded_once_on_demand(self):
+        token = RefreshToken.for_user(self.user)
+        # The first request looks the user up and records it as active
+        with self.assertNumQueries(1):
+            self.authenticate(token)
+
+        with self.assertNumQueries(0):
+            user = self.authenticate(token)
+            self.assertEqual((user.pk, user.username), (self.user.pk, self.user.username))
+            self.assertTrue(user.is_active)
+        self.assertIsInstance(user, User)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, "pat@example.com")
+            self.assertEqual(user.first_name, "Pat")
+            self.assertEqual(user.date_joined, self.user.date_joined)
+
+    @override_settings(USER_STATE_CACHE=None)
+    def test_every_request_loads_the_user_without_a_state_cache(self):
+        token = RefreshToken.for_user(self.user)
+        self.authenticate(token)
+        with self.assertNumQueries(1):
+            self.authenticate(token)
+
+    def test_stale_username_claim_is_refreshed_with_the_row(self):
+        token = RefreshToken.for_user(self.user)
+        self.authenticate(token)
+        User.objects.filter(pk=self.user.pk).update(username="renamed")
+
+        user = self.authenticate(token)
+        user.first_name
+
+        self.assertEqual(user.username, "renamed")
+
+    def test_deactivated_user_is_rejected(self):
+        token = RefreshToken.for_user(self.user)
+        self.authenticate(token)
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+        self.user.is_active = True
+        self.user.save()
+        self.assertEqual(self.authenticate(token).pk, self.user.pk)
+
+    def test_token_issued_before_activation_works_once_active(self):
+        self.user.is_active = False
+        self.user.save()
+        token = RefreshToken.for_user(self.user)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+        self.user.is_active = True
+        self.user.save()
+        self.assertEqual(self.authenticate(token).pk, self.user.pk)
+
+    def test_deleted_user_is_rejected(self):
+        token = RefreshToken.for_user(self.user)
+        self.authenticate(token)
+        self.user.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+    def test_tokens_without_claims_fall_back_to_the_database(self):
+        token = PlainRefreshToken.for_user(self.user)
+        with self.assertNumQueries(1):
+            user = self.authenticate(token)
+        self.assertEqual(user.email, "pat@example.com")
+
+    def test_task_list_and_create_with_bearer_token(self):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}"
+        )
+
+        response = client.post(
+            reverse("task-list-create"), {"title": "From claims"}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.user.tasks.get().title, "From claims")
+        self.assertEqual(client.get(reverse("task-list-create")).status_code, 200)
+
+
+class TokenBlacklistTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("Pat", "Lee", "pat@example.com", "pass")
+
+    def refresh(self, token):
+        return APIClient().post(
+            reverse("token_refresh"), {"refresh": str(token)}, format="json"
+        )
+
+    def test_rotated_token_is_rejected(self):
+        token = RefreshToken.for_user(self.user)
+
+        response = self.refresh(token)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("refresh", response.data)
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    @override_settings(TOKEN_BLACKLIST_CACHE="default")
+    def test_cached_checks_skip_the_tables(self):
+        token = RefreshToken.for_user(self.user)
+        rotated = self.refresh(token).data["refresh"]
+
+        with self.assertNumQueries(0):
+            RefreshToken(rotated)
+            with self.assertRaises(TokenError):
+                RefreshToken(str(token))
+
+        # Tokens the cache hasn't seen are checked against the tables
+        cache.clear()
+        with self.assertNumQueries(1):
+            RefreshToken(rotated)
+        with self.assertNumQueries(0):
+            RefreshToken(rotated)
+        with self.assertRaises(TokenError):
+            RefreshToken(str(token))
+
+    def test_prune_tokens_deletes_expired_rows(self):
+        live = RefreshToken.for_user(self.user)
+        expired = RefreshToken.for_user(self.user)
+        expired.blacklist()
+        OutstandingToken.objects.filter(jti=expired["jti"]).update(
+            expires_at="2000-01-01T00:00:00Z"
+        )
+
+        call_command("prune_tokens", "--batch-size", "1", stdout=mock.MagicMock())
+
+        self.assertEqual(
+            list(OutstandingToken.objects.values_list("jti", flat=True)), [live["jti"]]
+        )
+        self.assertFalse(BlacklistedToken.objects.exists())
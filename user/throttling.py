@@ -0,0 +1,17 @@
+from core.throttling import AccountRateThrottle, IPRateThrottle
+
+
+class LoginIPThrottle(IPRateThrottle):
+    scope = "login_ip"
+
+
+class LoginAccountThrottle(AccountRateThrottle):
+    scope = "login_account"
+
+
+class OTPIPThrottle(IPRateThrottle):
+    scope = "otp_ip"
+
+
+class OTPAccountThrottle(AccountRateThrottle):
+    scope = "otp_account"
@@ -0,0 +1,111 @@
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils.module_loading import import_string
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from .models import UserProfile
+
+logger = logging.getLogger(__name__)
+
+# source field -> (thumbnail field, bounding box, crop to fill the box)
+THUMBNAILS = {
+    "profile_picture": ("profile_picture_thumbnail", (128, 128), True),
+    "cover_picture": ("cover_picture_thumbnail", (960, 540), False),
+}
+
+
+def thumbnail_format():
+    return "WEBP" if features.check("webp") else "JPEG"
+
+
+def render_thumbnail(source, size, crop):
+    """Resize ``source`` (a file) to fit ``size`` and re-encode it."""
+    image_format = thumbnail_format()
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if crop:
+            image = ImageOps.fit(image, size, Image.LANCZOS)
+        else:
+            image.thumbnail(size, Image.LANCZOS)
+        if image_format == "JPEG" or image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGB" if image_format == "JPEG" else "RGBA")
+        output = BytesIO()
+        image.save(output, image_format, quality=80, method=4)
+    return ContentFile(output.getvalue()), image_format.lower()
+
+
+def generate_thumbnails(profile):
+    """Write thumbnails for each picture ``profile`` has and save them."""
+    updated = []
+    for source_field, (field, size, crop) in THUMBNAILS.items():
+        source = getattr(profile, source_field)
+        thumbnail = getattr(profile, field)
+        if thumbnail:
+            thumbnail.delete(save=False)
+            updated.append(field)
+        if not source:
+            continue
+        try:
+            with source.open("rb"):
+                content, extension = render_thumbnail(source, size, crop)
+        except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+            # Serializers fall back to the original picture
+            logger.exception(
+                "Thumbnail for %s of profile %s failed", source_field, profile.pk
+            )
+            continue
+        stem = os.path.splitext(os.path.basename(source.name))[0]
+        thumbnail.save(f"{stem}.{extension}", content, save=False)
+        if field not in updated:
+            updated.append(field)
+    if updated:
+        profile.save(update_fields=[*updated, "updated_at"])
+
+
+class ImmediateThumbnailQueue:
+    """Generates thumbnails in the request; for development and tests."""
+
+    def enqueue(self, profile):
+        UserProfile.objects.filter(pk=profile.pk).update(thumbnails_pending=False)
+        generate_thumbnails(profile)
+
+
+class DatabaseThumbnailQueue:
+    """
+    Profiles flagged ``thumbnails_pending`` are the queue; the
+    generate_thumbnails command works through them.
+    """
+
+    def enqueue(self, profile):
+        pass  # the flag saved with the upload is enough
+
+    def drain(self, batch_size=20):
+        """Process up to ``batch_size`` pending profiles; return the count."""
+        ids = list(
+            UserProfile.objects.filter(thumbnails_pending=True).values_list(
+                "pk", flat=True
+            )[:batch_size]
+        )
+        done = 0
+        for pk in ids:
+            # Claim the row so concurrent workers skip it; an upload that
+            # lands meanwhile sets the flag again and is picked up next time
+            if not UserProfile.objects.filter(pk=pk, thumbnails_pending=True).update(
+                thumbnails_pending=False
+            ):
+                continue
+            profile = UserProfile.objects.filter(pk=pk).first()
+            if profile is not None:
+                generate_thumbnails(profile)
+                done += 1
+        return done
+
+
+def get_thumbnail_queue():
+    return import_string(
+        getattr(settings, "THUMBNAIL_QUEUE_BACKEND", "user.thumbnails.DatabaseThumbnailQueue")
+    )()
@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+# User fields copied into tokens, so authentication can build request.user
+# without a query (see user.authentication). Nothing that decides whether
+# the token may be used: a claim can't change once issued.
+USER_CLAIMS = ("username",)
+
+OUTSTANDING = "outstanding"
+BLACKLISTED = "blacklisted"
+
+
+def blacklist_cache():
+    alias = getattr(settings, "TOKEN_BLACKLIST_CACHE", None)
+    return caches[alias] if alias else None
+
+
+class RefreshToken(tokens.RefreshToken):
+    """
+    Refresh token whose blacklist state is also kept per jti in the
+    TOKEN_BLACKLIST_CACHE cache alias, so checking a token issued or seen
+    before needs no query. Blacklisting writes through to the tables, and
+    anything the cache doesn't know is looked up there.
+
+    The alias must be shared by every process: a token blacklisted in one
+    process would otherwise still pass in another. Leave it unset to check
+    the tables only.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for field in USER_CLAIMS:
+            token[field] = getattr(user, field)
+        return token
+
+    def cache_key(self):
+        return f"jwt:blacklist:{self.payload[api_settings.JTI_CLAIM]}"
+
+    def set_jti(self):
+        super().set_jti()
+        cache = blacklist_cache()
+        if cache is not None:
+            # A fresh jti can't be blacklisted yet
+            cache.set(
+                self.cache_key(),
+                OUTSTANDING,
+                api_settings.REFRESH_TOKEN_LIFETIME.total_seconds(),
+            )
+
+    def check_blacklist(self):
+        cache = blacklist_cache()
+        if cache is None:
+            return super().check_blacklist()
+
+        state = cache.get(self.cache_key())
+        if state == BLACKLISTED:
+            raise TokenError(_("Token is blacklisted"))
+        if state == OUTSTANDING:
+            return
+        super().check_blacklist()
+        # add(), not set(): a concurrent blacklist() must win
+        cache.add(self.cache_key(), OUTSTANDING, self.remaining_seconds())
+
+    def blacklist(self):
+        result = super().blacklist()
+        cache = blacklist_cache()
+        if cache is not None:
+            cache.set(self.cache_key(), BLACKLISTED, self.remaining_seconds())
+        return result
+
+    def remaining_seconds(self):
+        return max(1, self.payload["exp"] - self.current_time.timestamp())
@@ -0,0 +1,126 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+ALLOWED_FORMATS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp"}
+
+
+def max_upload_size():
+    return getattr(settings, "UPLOAD_MAX_SIZE", 10 * 1024 * 1024)
+
+
+def max_pixels():
+    return getattr(settings, "IMAGE_UPLOAD_MAX_PIXELS", 16_000_000)
+
+
+def max_dimension():
+    return getattr(settings, "IMAGE_MAX_DIMENSION", 2048)
+
+
+class SizeLimitedUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams an upload to a temporary file and stops writing once it
+    passes UPLOAD_MAX_SIZE. The rest of the body is read and dropped,
+    but ``size`` keeps counting so validation can report the real size.
+    Installed per view with ``SizeLimitedUploadMixin``.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received <= max_upload_size():
+            self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.size = self.received
+        return file
+
+
+class SizeLimitedUploadMixin:
+    """Parse this view's multipart uploads with SizeLimitedUploadHandler."""
+
+    def initialize_request(self, request, *args, **kwargs):
+        request.upload_handlers = [SizeLimitedUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
+
+def validate_image_upload(upload):
+    """
+    Reject files over UPLOAD_MAX_SIZE and images whose header claims
+    more than IMAGE_UPLOAD_MAX_PIXELS, before any pixel data is decoded.
+    """
+    if upload.size > max_upload_size():
+        raise serializers.ValidationError(
+            f"Image must be at most {filesizeformat(max_upload_size())}."
+        )
+    upload.seek(0)
+    try:
+        # open() only parses the header
+        with Image.open(upload) as image:
+            image_format, (width, height) = image.format, image.size
+    except (OSError, Image.DecompressionBombError):
+        raise serializers.ValidationError("Upload a valid image.")
+    if image_format not in ALLOWED_FORMATS:
+        raise serializers.ValidationError("Image must be JPEG, PNG or WebP.")
+    if width * height > max_pixels():
+        raise serializers.ValidationError("Image dimensions are too large.")
+    upload.seek(0)
+    return upload
+
+
+def clean_image(upload):
+    """
+    Re-encode ``upload`` without EXIF/XMP metadata, scaled down to
+    IMAGE_MAX_DIMENSION and rotated upright. JPEGs are decoded at a reduced
+    scale when they are much larger than that; other formats are decoded
+    whole, which IMAGE_UPLOAD_MAX_PIXELS bounds.
+    """
+    size = (max_dimension(), max_dimension())
+    upload.seek(0)
+    with Image.open(upload) as image:
+        image_format = image.format
+        icc_profile = image.info.get("icc_profile")
+        image.draft(image.mode, size)
+        # Scale first so only the small copy is rotated; the bounding box
+        # is square, so the result fits either way round
+        image.thumbnail(size, Image.LANCZOS)
+        image = ImageOps.exif_transpose(image)
+        if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        output = BytesIO()
+        options = {"icc_profile": icc_profile} if icc_profile else {}
+        if image_format in ("JPEG", "WEBP"):
+            options["quality"] = 90
+        image.save(output, image_format, **options)
+
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    return InMemoryUploadedFile(
+        output,
+        "image",
+        f"{stem}.{ALLOWED_FORMATS[image_format]}",
+        Image.MIME[image_format],
+        output.tell(),
+        None,
+    )
+
+
+class BoundedImageField(serializers.ImageField):
+    """
+    ImageField that checks size and dimensions before Pillow touches the
+    pixels, and stores a metadata-free copy (see ``clean_image``).
+    """
+
+    def to_internal_value(self, data):
+        if hasattr(data, "size") and hasattr(data, "seek"):
+            validate_image_upload(data)
+        return clean_image(super().to_internal_value(data))
@@ -11,8 +11,8 @@ from .views import (
     SocialLoginView,
     ProfileView,
     ProfileUpdateView,
+    TokenRefreshView,
 )
-from dj_rest_auth.jwt_auth import get_refresh_view
 
 urlpatterns = [
     path("register/", RegisterView.as_view(), name="register"),
@@ -26,5 +26,5 @@ urlpatterns = [
     path("logout/", LogoutView.as_view(), name="logout"),
     path("profile/", ProfileView.as_view(), name="profile"),
     path("update_profile/", ProfileUpdateView.as_view(), name="update_profile"),
-    path("token/refresh/", get_refresh_view().as_view(), name="token_refresh"),
+    path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
 ]
@@ -1,8 +1,7 @@
-import random
 from rest_framework import status,generics
 from rest_framework.views import APIView
 from user.models import  UserProfile
-from rest_framework_simplejwt.tokens import RefreshToken
+from .tokens import RefreshToken
 from core.pagination import CustomPagination
 from .serializers import (
     ChangePasswordSerializer,
@@ -13,16 +12,28 @@ from .serializers import (
     UserSerializer,
     ActiveAccountSerializer,
     SocialLoginSerializer,
+    TokenRefreshSerializer,
 )
 from core.responses import CustomResponse
+from core.mail import get_mail_queue
+from .otp import get_otp_store
+from .profile_cache import get_profile_data, invalidate_profile
+from .thumbnails import get_thumbnail_queue
+from .uploads import SizeLimitedUploadMixin
+from .throttling import (
+    LoginAccountThrottle,
+    LoginIPThrottle,
+    OTPAccountThrottle,
+    OTPIPThrottle,
+)
+from core.throttling import RateLimitHeadersMixin
 from django.contrib.auth import get_user_model
-from django.conf import settings
-from django.core.mail import EmailMessage
 from django.utils.translation import gettext as _
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from django.shortcuts import get_object_or_404
 from rest_framework.exceptions import PermissionDenied
 from django.db.models import Q
+from django.db import transaction
+from dj_rest_auth.jwt_auth import get_refresh_view
 
 # Create your views here.
 User = get_user_model()
@@ -30,20 +41,15 @@ User = get_user_model()
 
 class SendOTPEmailMixin:
     def send_otp(self, email):
-        otp = random.randint(1000, 9999)
+        otp = get_otp_store().issue(email)
 
         self.send_message(email, f"Your OTP code is {otp}", "Your OTP Code")
         return otp
 
     def send_message(self, email, message, subject):
-        email = EmailMessage(
-            subject, message, from_email=settings.EMAIL_HOST_USER, to=[email]
-        )
-        try:
-            email.send()
-        except Exception as e:
-            # This because sending mail from pc issues
-            pass
+        # Queued rather than sent inline so the request doesn't wait on SMTP;
+        # the send_queued_mail worker delivers it.
+        get_mail_queue().enqueue(email, subject, message)
 
 
 class RegisterView(SendOTPEmailMixin, generics.CreateAPIView):
@@ -56,9 +62,7 @@ class RegisterView(SendOTPEmailMixin, generics.CreateAPIView):
             access_token = str(refresh.access_token)
 
             user_data = UserSerializer(user, context={"request": request}).data
-            otp = self.send_otp(user.email)
-            user.otp = otp
-            user.save()
+            self.send_otp(user.email)
 
             return CustomResponse(
                 data={
@@ -84,28 +88,27 @@ class ActiveAccountView(SendOTPEmailMixin, APIView):
             email = serializer.validated_data.get("email")
             otp = serializer.validated_data.get("otp")
 
-            try:
-                user = User.objects.get(email=email)
-            except User.DoesNotExist:
-                return CustomResponse(
-                    data={"error": "User not found"}, status=status.HTTP_404_NOT_FOUND
-                )
-
-            if user.otp == otp:
-                user.is_active = True
-                user.otp = None
-                user.save()
+            if get_otp_store().verify(email, otp):
+                if not User.objects.filter(email=email).update(is_active=True):
+                    return CustomResponse(
+                        data={"error": "User not found"},
+                        status=status.HTTP_404_NOT_FOUND,
+                    )
                 self.send_message(
                     email,
                     "account activated successfully",
                     "account activated successfully",
                 )
                 return CustomResponse(
-                    data=user.otp,
+                    data=None,
                     status=status.HTTP_200_OK,
                     message="Account activated successfully",
                 )
 
+            if not User.objects.filter(email=email).exists():
+                return CustomResponse(
+                    data={"error": "User not found"}, status=status.HTTP_404_NOT_FOUND
+                )
             return CustomResponse(
                 data={"error": "Invalid OTP"},
                 status=status.HTTP_400_BAD_REQUEST,
@@ -119,7 +122,9 @@ class ActiveAccountView(SendOTPEmailMixin, APIView):
         )
 
 
-class LoginView(APIView):
+class LoginView(RateLimitHeadersMixin, APIView):
+    throttle_classes = [LoginIPThrottle, LoginAccountThrottle]
+
     def post(self, request):
         email_or_username = request.data.get("email_or_username")
         password = request.data.get("password")
@@ -130,19 +135,27 @@ class LoginView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        try:
-            # Check if the input is an email or username
-            if "@" in email_or_username:
-                user = User.objects.get(email=email_or_username)
-            else:
-                user = User.objects.get(username=email_or_username)
-        except User.DoesNotExist:
+        # One query over the unique email/username indexes, with the profile
+        # UserSerializer needs. Generated usernames may contain "@", so both
+        # columns are checked; an email match wins.
+        candidates = list(
+            User.objects.select_related("userprofile").filter(
+                Q(email=email_or_username) | Q(username=email_or_username)
+            )[:2]
+        )
+        user = next(
+            (u for u in candidates if u.email == email_or_username),
+            candidates[0] if candidates else None,
+        )
+        if user is None:
             return CustomResponse(
                 data={"error": "Invalid credentials"},
                 status=status.HTTP_401_UNAUTHORIZED,
                 message="Invalid credentials",
             )
 
+        # check_password also re-hashes with the preferred PASSWORD_HASHERS
+        # entry when the stored hash uses an older hasher or fewer iterations
         if not user.check_password(password):
             return CustomResponse(
                 data={"error": "Invalid credentials"},
@@ -192,7 +205,7 @@ class ChangePasswordView(APIView):
                 )
 
             user.set_password(serializer.validated_data["new_password"])
-            user.save()
+            user.save(update_fields=["password"])
             return CustomResponse(
                 data={},
                 status=status.HTTP_200_OK,
@@ -205,25 +218,24 @@ class ChangePasswordView(APIView):
         )
 
 
-class ForgotPasswordView(SendOTPEmailMixin, generics.GenericAPIView):
+class ForgotPasswordView(
+    RateLimitHeadersMixin, SendOTPEmailMixin, generics.GenericAPIView
+):
     serializer_class = ForgotPasswordSerializer
+    throttle_classes = [OTPIPThrottle, OTPAccountThrottle]
 
     def post(self, request):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid(raise_exception=True):
             email = serializer.validated_data["email"]
-            try:
-                user = User.objects.get(email=email)
-            except User.DoesNotExist:
+            if not User.objects.filter(email=email).exists():
                 return CustomResponse(
                     data={},
                     message=_("User with this email does not exist."),
                     status=status.HTTP_404_NOT_FOUND,
                 )
 
-            otp = random.randint(1000, 9999)
-            user.otp = otp
-            user.save()
+            otp = get_otp_store().issue(email)
 
             subject = "Password Reset Request"
             message = f"Hello, use this code to reset your password {otp} ."
@@ -254,8 +266,8 @@ class ResetPasswordView(APIView):
                     )
 
                 user.set_password(password)
-                user.otp = None
-                user.save()
+                user.save(update_fields=["password"])
+                get_otp_store().clear(email)
                 return CustomResponse(
                     data={},
                     message="password changed successfully",
@@ -269,17 +281,23 @@ class ResetPasswordView(APIView):
                 )
 
 
-class ResendCodeView(generics.GenericAPIView, SendOTPEmailMixin):
+class ResendCodeView(
+    RateLimitHeadersMixin, generics.GenericAPIView, SendOTPEmailMixin
+):
     serializer_class = ForgotPasswordSerializer
+    throttle_classes = [OTPIPThrottle, OTPAccountThrottle]
 
     def post(self, request):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid(raise_exception=True):
             email = serializer.validated_data["email"]
-            otp = self.send_otp(email)
-            user = User.objects.get(email=email)
-            user.otp = otp
-            user.save()
+            if not User.objects.filter(email=email).exists():
+                return CustomResponse(
+                    data={},
+                    message=_("User with this email does not exist."),
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+            self.send_otp(email)
             return CustomResponse(
                 data={},
                 message=_("code has been sent successfully"),
@@ -287,7 +305,9 @@ class ResendCodeView(generics.GenericAPIView, SendOTPEmailMixin):
             )
 
 
-class SocialLoginView(generics.GenericAPIView, SendOTPEmailMixin):
+class SocialLoginView(
+    SizeLimitedUploadMixin, generics.GenericAPIView, SendOTPEmailMixin
+):
 
     def post(self, request, *args, **kwargs):
         serializer = SocialLoginSerializer(data=request.data)
@@ -297,11 +317,7 @@ class SocialLoginView(generics.GenericAPIView, SendOTPEmailMixin):
             )
             if created:
                 # New user registered
-                user.otp = random.randint(1000, 9999)
-                user.save()
-                self.send_message(
-                    user.email, f"Your OTP code is {user.otp}", "Your OTP Code"
-                )
+                self.send_otp(user.email)
                 return CustomResponse(
                     data={
                         "access": tokens["access"],
@@ -365,6 +381,10 @@ class LogoutView(generics.GenericAPIView):
             )
 
 
+class TokenRefreshView(get_refresh_view()):
+    serializer_class = TokenRefreshSerializer
+
+
 class ProfileView(APIView):
     serializer_class = UserSerializer
     permission_classes = [
@@ -372,20 +392,14 @@ class ProfileView(APIView):
     ]  # Allow both anonymous and authenticated users
 
     def get(self, request):
-        user = request.user
-        user = get_object_or_404(User, id=user.id)
-        serializer = self.serializer_class(
-            user, partial=True, context={"request": request}
-        )
-
         return CustomResponse(
-            data=serializer.data,
+            data=get_profile_data(request.user, request),
             message=_("User profile retrieved successfully"),
             status=status.HTTP_200_OK,
         )
 
 
-class ProfileUpdateView(APIView):
+class ProfileUpdateView(SizeLimitedUploadMixin, APIView):
     serializer_class = UserProfileUpdate
     permission_classes = [IsAuthenticated]
 
@@ -405,9 +419,11 @@ class ProfileUpdateView(APIView):
         )
         if serializer.is_valid():
             serializer.save()
-            user_serializer = UserSerializer(user, context={"request": request})
+            invalidate_profile(user.pk)
+            if profile.thumbnails_pending:
+                transaction.on_commit(lambda: get_thumbnail_queue().enqueue(profile))
             return CustomResponse(
-                data=user_serializer.data,
+                data=UserSerializer(user, context={"request": request}).data,
                 message=_("User profile updated successfully"),
                 status=status.HTTP_200_OK,
             )